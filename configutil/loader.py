@@ -0,0 +1,123 @@
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+SNAPSHOT_SUFFIX = ".snapshot"
+
+_cache = {}
+_instances = {}
+_lock = threading.Lock()
+
+
+def _read_snapshot(file_name, digest):
+    # JSON only holds data, a snapshot can't run code when it's loaded.
+    try:
+        with open(file_name + SNAPSHOT_SUFFIX, "r") as handler:
+            snapshot = json.load(handler)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(snapshot, dict) or snapshot.get("digest") != digest:
+        return None
+    return snapshot.get("object")
+
+
+def write_snapshot(file_name, obj=None, digest=None):
+    """
+    Save the parsed YAML file next to it as JSON, a process with the same
+    file will load the snapshot instead of parsing the YAML.
+
+    Nothing is saved if JSON can't keep the content as it is, e.g. dates
+    or keys which are not strings.
+
+    :param file_name: YAML file.
+    :param obj: Parsed content, the file will be parsed if it's None.
+    :param digest: SHA256 of the file content.
+    :return: True if the snapshot is saved.
+    :rtype: bool
+    """
+    if obj is None or digest is None:
+        with open(file_name, "rb") as handler:
+            content = handler.read()
+        digest = hashlib.sha256(content).hexdigest()
+        obj = yaml.load(content, Loader=YamlLoader)
+    try:
+        content = json.dumps({"digest": digest, "object": obj})
+    except (TypeError, ValueError):
+        return False
+    if json.loads(content)["object"] != obj:
+        return False
+    tmp_name = "{}.{}.tmp".format(file_name + SNAPSHOT_SUFFIX, os.getpid())
+    with open(tmp_name, "w") as handler:
+        handler.write(content)
+    os.replace(tmp_name, file_name + SNAPSHOT_SUFFIX)
+    return True
+
+
+def _get_entry(file_name):
+    """
+    Cache entry of the YAML file, refreshed when it's changed.
+    """
+    stat = os.stat(file_name)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    key = os.path.abspath(file_name)
+    with _lock:
+        entry = _cache.get(key)
+    if entry is not None and entry["stamp"] == stamp:
+        return entry
+
+    with open(file_name, "rb") as handler:
+        content = handler.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if entry is not None and entry["digest"] == digest:
+        # Touched only.
+        obj = entry["object"]
+    else:
+        obj = _read_snapshot(file_name, digest)
+    if obj is None:
+        obj = yaml.load(content, Loader=YamlLoader)
+        try:
+            write_snapshot(file_name, obj, digest)
+        except OSError as e:
+            logging.info("Can't write snapshot of {}: {}".format(file_name, e))
+    entry = {"stamp": stamp, "digest": digest, "object": obj}
+    with _lock:
+        _cache[key] = entry
+    return entry
+
+
+def load(file_name):
+    """
+    Parsed content of a YAML file, kept for the life of the process and
+    reloaded only when the file's mtime and hash change.
+
+    The result is shared, don't modify it.
+    """
+    return _get_entry(file_name)["object"]
+
+
+def load_instance(file_name, factory):
+    """
+    Object built by ``factory(file_name)``, e.g. a Configuration, cached
+    and rebuilt the same way as ``load``.
+    """
+    digest = _get_entry(file_name)["digest"]
+    key = (os.path.abspath(file_name), factory)
+    with _lock:
+        cached = _instances.get(key)
+    if cached is not None and cached[0] == digest:
+        return cached[1]
+    obj = factory(file_name)
+    with _lock:
+        _instances[key] = (digest, obj)
+    return obj
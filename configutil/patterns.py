@@ -0,0 +1,107 @@
+# -*- coding: UTF-8 -*-
+
+import re
+
+_META = ".^$*+?{}[]()|\\"
+# What's left of "^\/test\/.*?$" after its literal prefix.
+_MATCH_ALL = (".*?$", ".*$", ".*?", ".*", "")
+
+
+def literal_prefix(pattern):
+    """
+    Literal text every ``re.match`` of the pattern starts with.
+
+    :type pattern: str
+    :return: (prefix, True if the whole pattern is the literal prefix)
+    :rtype: tuple
+    """
+    prefix, rest = _split_prefix(pattern)
+    return prefix, rest == ""
+
+
+def _split_prefix(pattern):
+    """
+    :return: (literal prefix, rest of the pattern)
+    """
+    if "|" in pattern.replace("\\\\", "").replace("\\|", ""):
+        return "", pattern
+    prefix = ""
+    i = 0
+    if pattern.startswith("^"):
+        i = 1
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                # \d, \w, \A, back references...
+                break
+            char = pattern[i + 1]
+            step = 2
+        elif char in _META:
+            break
+        else:
+            step = 1
+        quantifier = pattern[i + step:i + step + 1]
+        if quantifier in ("*", "?", "{"):
+            # The char is optional.
+            break
+        prefix += char
+        i += step
+        if quantifier == "+":
+            break
+    return prefix, pattern[i:]
+
+
+class PatternMatcher:
+    """
+    Tell if any of the patterns ``re.match`` a text, in one pass.
+
+    Patterns like ``^\/test\/.*?$`` are plain prefix tests, the others
+    without groups are combined into one alternation.
+    """
+    _prefixes = None
+    _combined = None
+    _patterns = None
+
+    def __init__(self, patterns):
+        """
+        :type patterns: list of str
+        """
+        prefixes = []
+        others = []
+        for pattern in patterns:
+            prefix, rest = _split_prefix(pattern)
+            if rest in _MATCH_ALL:
+                prefixes.append(prefix)
+            else:
+                others.append(pattern)
+        self._prefixes = tuple(prefixes)
+        compiled = [re.compile(pattern) for pattern in others]
+        # Group numbers shift in an alternation, and group names may be
+        # used twice, patterns with groups (and so back references) are
+        # matched on their own, as CommandDispatcher does.
+        combinable = [pattern.pattern for pattern in compiled
+                      if pattern.groups == 0]
+        patterns = [pattern for pattern in compiled if pattern.groups > 0]
+        if len(combinable) > 0:
+            try:
+                self._combined = re.compile("|".join(
+                    ["(?:{})".format(pattern) for pattern in combinable]))
+            except re.error:
+                # e.g. global flags in the middle of the alternation.
+                patterns = compiled
+        self._patterns = tuple(patterns)
+
+    def match(self, text):
+        """
+        :rtype: bool
+        """
+        if text.startswith(self._prefixes):
+            return True
+        if self._combined is not None and \
+                self._combined.match(text) is not None:
+            return True
+        for pattern in self._patterns:
+            if pattern.match(text) is not None:
+                return True
+        return False
@@ -1,12 +1,22 @@
 #/usr/bin/env python3
 from gitutil.configure import Configuration
-from gitutil.commands import GitCommand
+from gitutil.refresh import iter_refresh_repositories
+from gitutil.worktree import WorktreeManager
 import os
 
 REPOSITORY_CONFIG_FILE = os.getenv("REPOSITORY_CONFIG_FILE")
 REPOSITORY_NAME = os.getenv("REPOSITORY")
-config = Configuration(REPOSITORY_CONFIG_FILE)
+REFRESH_PARALLEL = int(os.getenv("REFRESH_PARALLEL", "4"))
+REFRESH_TIMEOUT = int(os.getenv("REFRESH_TIMEOUT", "300"))
+config = Configuration.load(REPOSITORY_CONFIG_FILE)
 
-for branch in config["branches"]:
-    cmd = GitCommand(branch["path"])
-    cmd.pull()
+branches = config.get_repository(REPOSITORY_NAME)["branches"]
+mirror = config.get_mirror(REPOSITORY_NAME)
+if mirror is None:
+    progress = iter_refresh_repositories(
+        [branch["path"] for branch in branches],
+        REFRESH_PARALLEL, REFRESH_TIMEOUT)
+else:
+    progress = WorktreeManager(mirror, branches).refresh()
+for path, succeeded, output in progress:
+    print("{}: {}".format(path, output if succeeded else "FAILED " + output))
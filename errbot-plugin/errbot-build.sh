@@ -8,6 +8,7 @@ cp Dockerfile "${DEST}/"
 cp prepare.sh "${DEST}/"
 cp requirements.txt "${DEST}/"
 cp -Rf transbot "${DEST}/"
+cp -Rf ../configutil "${DEST}/transbot/configutil"
 cp -Rf ../githubutil "${DEST}/transbot/githubutil"
 cp -Rf ../gitutil "${DEST}/transbot/gitutil"
 cp -Rf ../transutil "${DEST}/transbot/transutil"
@@ -1,24 +1,48 @@
 # -*- coding: UTF-8 -*-
 import os
-import github
 import githubutil
+from githubutil import httpcache
 from githubutil.github import GithubOperator
+from githubutil.transport import get_client
 from gitutil.configure import Configuration as RepoConfig
-from gitutil.commands import GitCommand
+from gitutil.refresh import iter_refresh_repositories
+from gitutil.worktree import WorktreeManager
+from transutil.scanner import ScanEngine
 from transutil.transutil import TranslateUtil
 from errbot import BotPlugin, botcmd, arg_botcmd
 import logging
 
 MAX_RESULT = int(os.getenv("MAX_RESULT"))
 MAX_WRITE = int(os.getenv("MAX_WRITE"))
-OPEN_CACHE = "/errbot/config/open_cache.txt"
+OPEN_CACHE = "/errbot/config/open_cache.db"
+JOURNAL_FILE = "/errbot/config/issue_journal-{}-{}-{}.jsonl"
 REPOSITORY_CONFIG_FILE = os.getenv("REPOSITORY_CONFIG_FILE")
 REPOSITORY_NAME = os.getenv("REPOSITORY")
 TARGET_LANG = os.getenv("TARGET_LANG")
+SCAN_STATE_PATH = os.getenv("SCAN_STATE_PATH", "")
+GIT_WORKERS = int(os.getenv("GIT_WORKERS", "1"))
+READ_GIT_INDEX = os.getenv("READ_GIT_INDEX", "0") != "0"
+REFRESH_PARALLEL = int(os.getenv("REFRESH_PARALLEL", "4"))
+REFRESH_TIMEOUT = int(os.getenv("REFRESH_TIMEOUT", "300"))
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "0")) or None
+TOKEN_POOL = os.getenv("TOKEN_POOL", "0") != "0"
+GRAPHQL_ENDPOINT = os.getenv("GRAPHQL_ENDPOINT", "") or None
+GITHUB_CACHE = os.getenv("GITHUB_CACHE", "")
 
+httpcache.configure(GITHUB_CACHE)
 
-def build_issue(trans, branch, item_list):
-    trans.wait_for_limit(MAX_RESULT, MAX_RESULT)
+
+def build_issue(trans, branch, item_list, dedupe_index=None):
+    """
+    Create issues for the files, unfinished issues of the last run are
+    resumed first.
+
+    :param item_list: New files, or dict of updated files to diffs, an
+    empty list only resumes the journal of new files.
+    :param dedupe_index: Open issues of the branch, listed here if it's
+    None.
+    :return: Generator of progress messages.
+    """
     if type(item_list) == dict:
         file_list = list(item_list.keys())
         type_label = "sync/update"
@@ -34,10 +58,12 @@ def build_issue(trans, branch, item_list):
     new_labels.append(type_label)
     search_labels = trans.get_search_label(
         REPOSITORY_NAME, branch, TARGET_LANG)
+    if dedupe_index is None:
+        # One listing of the open issues instead of a search per file.
+        dedupe_index = trans.build_issue_index(task_repository_name(),
+                                               search_labels, MAX_RESULT)
 
-    # Create Issue for new files
-    new_count = 0
-    skip_count = 0
+    items = []
     for file_name in file_list:
         # Generate issue body
         if is_diff:
@@ -54,26 +80,28 @@ def build_issue(trans, branch, item_list):
                 file_name,
                 trans.gen_source_url(REPOSITORY_NAME, branch, file_name),
             )
+        items.append({"title": file_name, "body": body,
+                      "labels": new_labels})
 
-        # Search and create issue
-        new_issue = trans.create_issue(
-            task_repository_name(),
-            file_name, body, new_labels, search_labels,
-            "", True
-        )
-        if new_issue is None:
+    journal_file = JOURNAL_FILE.format(branch, TARGET_LANG,
+                                       type_label.split("/")[-1])
+    new_count = 0
+    skip_count = 0
+    for _, state, _ in trans.create_issues(
+            task_repository_name(), journal_file, items, search_labels,
+            dedupe_index, MAX_WRITE, MAX_RESULT):
+        if state == "skipped":
             skip_count += 1
-        else:
+        elif state == "created":
             new_count += 1
-            if new_count >= MAX_WRITE:
-                break
-        if (new_count + skip_count) % MAX_RESULT:
-            trans.wait_for_limit(MAX_RESULT, MAX_RESULT)
-    return new_count, skip_count
+            if new_count % MAX_RESULT == 0:
+                yield ("{} Issues had been created.".format(new_count))
+    yield ("{} Issues had been created. {} Issues had been skipped.".format(
+        new_count, skip_count))
 
 
 def task_repository_name():
-    repo_config = RepoConfig(REPOSITORY_CONFIG_FILE)
+    repo_config = RepoConfig.load(REPOSITORY_CONFIG_FILE)
     repo_obj = repo_config.get_repository(REPOSITORY_NAME)
     repo_owner = repo_obj["github"]["task"]["owner"]
     repo_name = repo_obj["github"]["task"]["repository"]
@@ -81,7 +109,7 @@ def task_repository_name():
 
 
 def code_repository_name():
-    repo_config = RepoConfig(REPOSITORY_CONFIG_FILE)
+    repo_config = RepoConfig.load(REPOSITORY_CONFIG_FILE)
     repo_obj = repo_config.get_repository(REPOSITORY_NAME)
     repo_owner = repo_obj["github"]["code"]["owner"]
     repo_name = repo_obj["github"]["code"]["repository"]
@@ -129,7 +157,23 @@ class TransBot(BotPlugin):
         :rtype: TranslateUtil
         """
         token = self[msg.frm.person + "github_token"]
-        return TranslateUtil(REPOSITORY_CONFIG_FILE, token)
+        return TranslateUtil(REPOSITORY_CONFIG_FILE, token,
+                             state_path=SCAN_STATE_PATH,
+                             git_workers=GIT_WORKERS,
+                             read_index=READ_GIT_INDEX,
+                             read_tokens=self._pool_tokens(),
+                             graphql_endpoint=GRAPHQL_ENDPOINT)
+
+    def _pool_tokens(self):
+        """
+        Tokens of all the bound users, for spreading read-only requests
+        when TOKEN_POOL is enabled.
+        :rtype: list of str
+        """
+        if not TOKEN_POOL:
+            return None
+        return [self[key] for key in self.keys()
+                if key.endswith("github_token")]
 
     @botcmd
     def list_branches(self, msg, args):
@@ -173,7 +217,7 @@ class TransBot(BotPlugin):
 
     @arg_botcmd('token', type=str)
     def github_bind(self, msg, token):
-        client = github.Github(token)
+        client = get_client(token)
         from_user = msg.frm.person
         user = client.get_user()
         self[from_user + "github_token"] = token
@@ -268,7 +312,7 @@ class TransBot(BotPlugin):
     @botcmd
     def cache_issue(self, msg, args):
         """
-        Save opening issues into a text file
+        Save opening issues into the local issue store
         :param msg:
         :param args:
         """
@@ -279,11 +323,26 @@ class TransBot(BotPlugin):
             task_repository_name()
         )
         res = trans.cache_issues(query, OPEN_CACHE, MAX_RESULT)
-        return "{} records had been cached".format(res)
+        yield ("{} records had been cached".format(res))
+
+    @botcmd
+    def refresh_issue_cache(self, msg, args):
+        """
+        Update the local issue store with the issues changed since the
+        last caching.
+        """
+        self._asset_bind(msg)
+        yield ("Processing....")
+        trans = self._translation_util(msg)
+        updated, removed = trans.refresh_issue_cache(
+            task_repository_name(), OPEN_CACHE, MAX_RESULT)
+        yield ("{} records had been updated, {} closed issues removed.".format(
+            updated, removed))
 
     @arg_botcmd('branch', type=str)
     @arg_botcmd('--create_issue', type=int, default=0)
-    def find_new_files_in(self, msg, branch, create_issue):
+    @arg_botcmd('--full_scan', type=int, default=0)
+    def find_new_files_in(self, msg, branch, create_issue, full_scan):
         """
         Find new files from a branch for a language.
         :param msg:
@@ -291,44 +350,83 @@ class TransBot(BotPlugin):
         :param create_issue: if its value is
         0 (default), will only show the new files.
         else it will create new issue for them.
+        :param full_scan: Rescan the whole tree if it's not 0.
         :return:
         """
         self._asset_bind(msg)
         trans = self._translation_util(msg)
         new_file_list = trans.find_new_files(
-            REPOSITORY_NAME, branch, TARGET_LANG)
+            REPOSITORY_NAME, branch, TARGET_LANG, full_scan != 0)
 
         if create_issue == 0:
             yield ("\n".join(limit_result(new_file_list)))
         else:
             yield ("Processing....")
-            new_count, skip_count = build_issue(trans, branch, new_file_list)
-            yield ("{} Issues had been created. {} Issues had been skipped.".format(
-                new_count, skip_count))
+            for message in build_issue(trans, branch, new_file_list):
+                yield (message)
             yield ("Please cache issues again.")
 
     @arg_botcmd('branch', type=str)
     @arg_botcmd('--create_issue', type=int, default=0)
-    def find_updated_files_in(self, msg, branch, create_issue):
+    @arg_botcmd('--full_scan', type=int, default=0)
+    def find_updated_files_in(self, msg, branch, create_issue, full_scan):
         """
         Find updated files from a branch for a language.
 
         :param msg:
         :param branch:
         :param create_issue:
+        :param full_scan: Rescan the whole tree if it's not 0.
         """
         self._asset_bind(msg)
         yield ("Processing....")
         trans = self._translation_util(msg)
-        updated_files = trans.find_updated_files(REPOSITORY_NAME, branch, TARGET_LANG)
+        updated_files = trans.find_updated_files(REPOSITORY_NAME, branch,
+                                                 TARGET_LANG, full_scan != 0)
         if create_issue == 0:
             yield ("\n".join(limit_result(list(updated_files.keys()))))
         else:
-            new_count, skip_count = build_issue(trans, branch, updated_files)
-            yield ("{} Issues had been created. {} Issues had been skipped.".format(
-                new_count, skip_count))
+            for message in build_issue(trans, branch, updated_files):
+                yield (message)
             yield ("Please cache issues again.")
 
+    @botcmd
+    def scan_all_branches(self, msg, args):
+        """
+        Find new and updated files of all branches for the language.
+        """
+        yield ("Processing....")
+        engine = ScanEngine(REPOSITORY_CONFIG_FILE, SCAN_WORKERS,
+                            state_path=SCAN_STATE_PATH,
+                            read_index=READ_GIT_INDEX)
+        progress = engine.iter_scan([REPOSITORY_NAME], None, [TARGET_LANG])
+        for _, branch, result, error in progress:
+            if error is not None:
+                yield ("Failed to scan {}: {}".format(branch, error))
+                continue
+            yield ("{}: {} new files, {} updated files.".format(
+                branch, len(result[TARGET_LANG]["new"]),
+                len(result[TARGET_LANG]["updated"])))
+
+    @arg_botcmd('branch', type=str)
+    def resume_issues_in(self, msg, branch):
+        """
+        Finish the issues left by an interrupted or limited creation.
+        """
+        self._asset_bind(msg)
+        yield ("Processing....")
+        trans = self._translation_util(msg)
+        # Both journals share the listing, issues created by the first are
+        # added to it.
+        dedupe_index = trans.build_issue_index(
+            task_repository_name(),
+            trans.get_search_label(REPOSITORY_NAME, branch, TARGET_LANG),
+            MAX_RESULT)
+        for item_list in [], {}:
+            for message in build_issue(trans, branch, item_list,
+                                       dedupe_index):
+                yield (message)
+
     @botcmd
     def show_limit(self, msg, args):
         self._asset_bind(msg)
@@ -347,12 +445,34 @@ class TransBot(BotPlugin):
 
     @botcmd
     def refresh_repositories(self, msg, args):
-        config = RepoConfig(REPOSITORY_CONFIG_FILE)
+        config = RepoConfig.load(REPOSITORY_CONFIG_FILE)
+        branches = config.get_repository(REPOSITORY_NAME)["branches"]
+        mirror = config.get_mirror(REPOSITORY_NAME)
+        if mirror is None:
+            path_list = [branch["path"] for branch in branches]
+            progress = iter_refresh_repositories(
+                path_list, REFRESH_PARALLEL, REFRESH_TIMEOUT)
+        else:
+            progress = WorktreeManager(mirror, branches).refresh()
+        for path, succeeded, output in progress:
+            if succeeded:
+                yield ("{} had been updated.".format(path))
+            else:
+                yield ("Failed to update {}: {}".format(path, output))
+
+    @botcmd
+    def setup_worktrees(self, msg, args):
+        """
+        Create the shared mirror and the worktrees of all branches.
+        """
+        config = RepoConfig.load(REPOSITORY_CONFIG_FILE)
+        mirror = config.get_mirror(REPOSITORY_NAME)
+        if mirror is None:
+            yield ("No mirror configured for {}.".format(REPOSITORY_NAME))
+            return
         branches = config.get_repository(REPOSITORY_NAME)["branches"]
-        for branch in branches:
-            cmd = GitCommand(branch["path"])
-            cmd.pull()
-            yield ("{} had been updated.".format((branch["path"])))
+        for message in WorktreeManager(mirror, branches).setup():
+            yield (message)
 
     @arg_botcmd('branch', type=str)
     def sync_with_pr_in(self, msg, branch):
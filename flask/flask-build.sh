@@ -5,10 +5,14 @@ TMP="/tmp/$CODE"
 mkdir -p "$TMP"
 
 cp -Rf ../githubutil "$TMP"
+cp -Rf ../configutil "$TMP"
 cp ../config/workflow.yaml "$TMP/config.yaml"
 cp flask-requirements.txt "$TMP/requirements.txt"
 cd "$TMP"
 
+# Pre-parsed config, cold starts skip YAML parsing.
+python3 -c "from configutil import loader; loader.write_snapshot('config.yaml')"
+
 find . -name __pycache__ -exec rm -Rf {} \;
 find . -name *.pyc -exec rm -Rf {} \;
 
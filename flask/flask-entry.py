@@ -5,7 +5,7 @@ from github_webhook import Webhook
 from flask import Flask
 import os
 import sys
-from githubutil import action
+from githubutil import action, httpcache
 
 import logging.handlers
 
@@ -15,6 +15,7 @@ PORT = os.getenv("PORT", "80")
 TOKEN = os.getenv('GITHUB_TOKEN', "")
 WORKFLOW = os.getenv('WORKFLOW', "")
 ADMINS = os.getenv('ADMINS', "")
+GITHUB_CACHE = os.getenv('GITHUB_CACHE', "")
 
 
 handler = logging.StreamHandler(sys.stdout)
@@ -27,6 +28,8 @@ logger = logging.getLogger()
 logger.addHandler(handler)
 logger.setLevel(int(LOG_LEVEL))
 
+httpcache.configure(GITHUB_CACHE)
+
 app = Flask(__name__)
 webhook = Webhook(app)
 
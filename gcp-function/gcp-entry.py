@@ -3,12 +3,15 @@
 
 import os
 from google.cloud import logging
-from githubutil import action
+from githubutil import action, httpcache
 
 TOKEN = os.getenv('GITHUB_TOKEN', "")
 WORKFLOW = os.getenv('WORKFLOW', "")
 ADMINS = os.getenv('ADMINS', "")
 INTERVAL = os.getenv('INTERVAL', "1")
+GITHUB_CACHE = os.getenv('GITHUB_CACHE', "")
+
+httpcache.configure(GITHUB_CACHE)
 
 logging_client = logging.Client()
 log_name = "github-webhook-{}".format(WORKFLOW)
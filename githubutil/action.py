@@ -5,7 +5,7 @@ from githubutil import configure, github
 
 def execute(config, token, workflow,
             admin_list, event, subject, interval=1):
-    conf = configure.Configuration(config)
+    conf = configure.Configuration.load(config)
     action = github.GithubAction(token)
     action.write_interval = interval
     action.label_list = conf.get_labels(workflow)
@@ -1,26 +1,98 @@
 # -*- coding: UTF-8 -*-
 
-import yaml
+from configutil import loader
+from configutil.patterns import literal_prefix
 import re
 
 
+class CommandDispatcher:
+    """
+    Find the first command of an event whose regex matches the text,
+    same as trying ``re.match`` on them in order.
+    """
+    _commands = None
+    _candidates = None
+    _prefix_free = None
+    _combined = None
+
+    def __init__(self, commands):
+        """
+        :param commands: Command items of the event.
+        :type commands: list of dict
+        """
+        self._commands = list(commands)
+        # (index, compiled regex, literal prefix, regex is the prefix)
+        entries = []
+        for index, item in enumerate(self._commands):
+            prefix, literal = literal_prefix(item["regex"])
+            entries.append((index, re.compile(item["regex"]), prefix, literal))
+
+        # Only commands starting with the same char as the text can match.
+        self._prefix_free = [entry for entry in entries if entry[2] == ""]
+        self._candidates = {}
+        for first_char in set([entry[2][0] for entry in entries if entry[2]]):
+            self._candidates[first_char] = [
+                entry for entry in entries
+                if entry[2] == "" or entry[2][0] == first_char]
+
+        # One alternation in the original order, the first alternative
+        # which matches is the first matching command.
+        if all([entry[1].groups == 0 for entry in entries]):
+            try:
+                self._combined = re.compile("|".join(
+                    ["(?P<c{}>{})".format(index, item["regex"])
+                     for index, item in enumerate(self._commands)]))
+            except re.error:
+                self._combined = None
+
+    def match(self, text):
+        """
+        :rtype: dict
+        """
+        candidates = self._candidates.get(text[:1], self._prefix_free)
+        candidates = [entry for entry in candidates
+                      if text.startswith(entry[2])]
+        if len(candidates) == 0:
+            return None
+        index, pattern, _, literal = candidates[0]
+        if literal:
+            return self._commands[index]
+        if self._combined is not None:
+            match = self._combined.match(text)
+            if match is None:
+                return None
+            return self._commands[int(match.lastgroup[1:])]
+        for index, pattern, _, literal in candidates:
+            if literal or pattern.match(text) is not None:
+                return self._commands[index]
+        return None
+
+
 class Configuration:
     __configure_file = ""
     __configure_object = None
+    __workflows = None
+    __dispatchers = None
 
     def __init__(self, configfile):
-        with open(configfile, "r") as handler:
-            self.__configure_object = yaml.load(handler)
-
-    def __get_workflow(self, name=""):
+        self.__configure_object = loader.load(configfile)
+        self.__workflows = {}
+        self.__dispatchers = {}
         for item in self.__configure_object["workflow"]:
-            if item["name"] == name:
-                return item
-        return None
+            self.__workflows.setdefault(item["name"], item)
+            for event, commands in item["events"].items():
+                self.__dispatchers.setdefault(
+                    (item["name"], event), CommandDispatcher(commands))
 
-    def __get_event(self, workflow, event):
-        wf = self.__get_workflow(workflow)
-        return wf["events"][event]
+    @classmethod
+    def load(cls, configfile):
+        """
+        Shared instance for the file, rebuilt only when the file changes.
+        """
+        return loader.load_instance(configfile, cls)
+
+    def __get_workflow(self, name=""):
+        return self.__workflows.get(name)
 
     def list_workflow(self):
         workflow_name_list = []
@@ -29,12 +101,7 @@ class Configuration:
         return workflow_name_list
 
     def get_command(self, workflow, event, text):
-        event_object = self.__get_event(workflow, event)
-        for item in event_object:
-            match = re.match(item["regex"], text)
-            if match is not None:
-                return item
-        return None
+        return self.__dispatchers[(workflow, event)].match(text)
 
     def get_labels(self, workflow):
         return self.__get_workflow(workflow)["labels"]
@@ -1,35 +1,79 @@
 # -*- coding: UTF-8 -*-
-import datetime
-
 import github
 import re
 import time
 import logging
+from datetime import datetime, timezone
+
+from githubutil import ratelimit
+from githubutil.transport import get_client
+
+
+# Github asks for at least one second between content creating requests.
+MIN_WRITE_INTERVAL = 1
+SECONDARY_LIMIT_WAIT = 60
+MAX_WRITE_RETRY = 5
+
+
+def _get_retry_after(exception):
+    """
+    Seconds to wait before retrying, None if the exception isn't caused
+    by rate limits.
+
+    :type exception: github.GithubException
+    :rtype: float
+    """
+    if exception.status not in (403, 429):
+        return None
+    headers = {key.lower(): value
+               for key, value in (exception.headers or {}).items()}
+    if "retry-after" in headers:
+        return float(headers["retry-after"])
+    if headers.get("x-ratelimit-remaining") == "0" and \
+            "x-ratelimit-reset" in headers:
+        return max(float(headers["x-ratelimit-reset"]) - time.time(), 0) + 1
+    if "rate limit" in str(exception.data).lower():
+        return SECONDARY_LIMIT_WAIT
+    return None
 
 
 class GithubOperator:
     _token = ""
     _client = None
+    _lazy_client = None
+    _repos = None
+    _last_write = 0
     admin_list = None
     write_interval = 1
 
     def __init__(self, token):
         self._token = token
-        self._client = github.Github(self._token)
+        self._client = get_client(self._token)
+        self._lazy_client = get_client(self._token, lazy=True)
+        self._repos = {}
 
     def get_repo(self, repo_name):
         """
-        Get an Repository Object by its name.
+        Get an Repository Object by its name, a repository got by full
+        name is not fetched until its attributes are read.
         :type repo_name: str
-        :param repo_name: full name of the repository
+        :param repo_name: full name of the repository, or its id
         :return: Repository Name
         :rtype: github.Repository.Repository
         """
-        return self._client.get_repo(repo_name)
+        if repo_name not in self._repos:
+            if isinstance(repo_name, str):
+                client = self._lazy_client
+            else:
+                client = self._client
+            self._repos[repo_name] = client.get_repo(repo_name)
+        return self._repos[repo_name]
 
     def get_issue(self, repository_name, issue_id):
         """
-        Get issue object
+        Get issue object, of a repository got by full name it's not
+        fetched until its attributes are read, so it costs no request
+        when it's only written.
         :param repository_name:
         :param issue_id:
         :rtype: github.Issue.Issue
@@ -58,6 +102,40 @@ class GithubOperator:
             result.append(issue)
         return result
 
+    def list_issues(self, repository_name, state="open", since=None,
+                    labels=None):
+        """
+        List issues of a repository with the REST API, least recently
+        updated first, ``transport.PER_PAGE`` issues per request. Pull
+        requests are included, as Github does.
+
+        :param state: "open", "closed" or "all".
+        :param since: Only issues updated at or after this time.
+        :type since: datetime.datetime
+        :param labels: Only issues with all of these labels.
+        :type labels: list of str
+        :rtype: github.PaginatedList.PaginatedList
+        """
+        repo = self.get_repo(repository_name)
+        kwargs = {"state": state, "sort": "updated", "direction": "asc"}
+        if since is not None:
+            kwargs["since"] = since
+        if labels:
+            kwargs["labels"] = list(labels)
+        return repo.get_issues(**kwargs)
+
+    def get_server_time(self, timestamp=None):
+        """
+        :param timestamp: Local epoch seconds, defaults to now.
+        :return: UTC time of the Github server at ``timestamp``, by the
+        responses to this token.
+        :rtype: datetime.datetime
+        """
+        server_time = ratelimit.get_scheduler(self._token).get_server_time(
+            timestamp)
+        return datetime.fromtimestamp(server_time, timezone.utc).replace(
+            tzinfo=None)
+
     def get_limit(self):
         limit = self._client.get_rate_limit()
         return {
@@ -75,35 +153,86 @@ class GithubOperator:
 
     def check_limit(self, core_limit=10, search_limit=10):
         """
-        Wait for rate limit of github
+        Wait for rate limit of github, until the reset if the budget is
+        lower than the limit. The budgets come from the headers of the
+        responses of all clients of the token, no request is sent.
         :param core_limit:
         :param search_limit:
         """
+        scheduler = ratelimit.get_scheduler(self._token)
+        scheduler.wait("core", core_limit)
+        scheduler.wait("search", search_limit + 1)
 
-        limit = self._client.get_rate_limit()
-        now = datetime.datetime.utcnow()
-
-        if limit.core.remaining < core_limit:
-            tick = (limit.core.reset - now).total_seconds()
-            logging.warning(
-                "Waiting core limits for {} seconds.".format(tick))
-            time.sleep(tick + 2)
-        if limit.search.remaining <= search_limit:
-            tick = (limit.search.reset - now).total_seconds()
-            logging.warning(
-                "Waiting search limits for {} seconds.".format(tick))
-            time.sleep(tick + 2)
-
-    def create_issue(self, repository_name, title, body):
+    def write(self, func, *args, **kwargs):
+        """
+        Call a content creating API as fast as Github's secondary rate
+        limits allow: calls are spaced by ``write_interval`` seconds, and
+        retried after the time Github asks for when they are limited.
+
+        :param func: e.g. ``repo.create_issue``.
+        :return: Result of the call.
+        """
+        for retry in range(MAX_WRITE_RETRY + 1):
+            wait = self._last_write + max(self.write_interval,
+                                          MIN_WRITE_INTERVAL) - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return func(*args, **kwargs)
+            except github.GithubException as e:
+                retry_after = _get_retry_after(e)
+                if retry_after is None or retry >= MAX_WRITE_RETRY:
+                    raise
+                logging.warning(
+                    "Rate limited, retry in {} seconds.".format(retry_after))
+                time.sleep(retry_after)
+            finally:
+                self._last_write = time.time()
+
+    def create_issue(self, repository_name, title, body, labels=None,
+                     assignee=None, milestone=None):
         """
-        Create an issue in specified repository/
+        Create an issue in specified repository, the labels, assignee and
+        milestone are set by the same request.
         :param repository_name:
         :param title:
         :param body:
+        :type labels: list of str
+        :param assignee: Login of the assignee.
+        :type assignee: str
+        :param milestone: Title of an open milestone, or the object.
         :rtype: github.Issue.Issue
         """
         repo = self.get_repo(repository_name)
-        return repo.create_issue(title, body)
+        kwargs = {}
+        if labels:
+            kwargs["labels"] = list(labels)
+        if assignee:
+            kwargs["assignee"] = assignee
+        if isinstance(milestone, str):
+            milestone = self._find_milestone(repo, milestone)
+        if milestone is not None:
+            kwargs["milestone"] = milestone
+        return repo.create_issue(title, body, **kwargs)
+
+    def replace_labels(self, issue, labels, current=None):
+        """
+        Replace the labels of an issue with one request, nothing is sent
+        if the issue has these labels already.
+        :type issue: github.Issue.Issue
+        :param labels: All the labels the issue should have.
+        :type labels: list of str
+        :param current: Labels the issue has, read from it if it's None.
+        :type current: list of str
+        :return: True if the labels are changed.
+        :rtype: bool
+        """
+        if current is None:
+            current = [label.name for label in issue.labels]
+        if set(current) == set(labels):
+            return False
+        issue.set_labels(*labels)
+        return True
 
     def issue_comment(self, repository_name, issue_id, comment_body):
         """
@@ -119,11 +248,20 @@ class GithubOperator:
         if isinstance(issue, int):
             issue = self.get_issue(repository_name, issue)
         repo = self.get_repo(repository_name)
-        milestone_list = repo.get_milestones(state="open")
-        for ms in milestone_list:
+        ms = self._find_milestone(repo, milestone_name)
+        if ms is None:
+            return None
+        issue.edit(milestone=ms)
+        return issue
+
+    def _find_milestone(self, repo, milestone_name):
+        """
+        :type repo: github.Repository.Repository
+        :rtype: github.Milestone.Milestone
+        """
+        for ms in repo.get_milestones(state="open"):
             if ms.title == milestone_name:
-                issue.edit(milestone=ms)
-                return issue
+                return ms
         return None
 
 
@@ -145,7 +283,8 @@ class GithubAction(GithubOperator):
         if action["type"] == "create_issue":
             time.sleep(self.write_interval)
             return self.create_issue(subject["repo"],
-                                     action["title"], action["body"])
+                                     action["title"], action["body"],
+                                     action.get("labels"))
 
     def _create_issue(self, subject, title, body):
         repo = self.get_repo(subject["repo"])
@@ -154,21 +293,24 @@ class GithubAction(GithubOperator):
         return repo.create_issue(title, body)
 
     def _set_label(self, subject, group, label, mutex=False):
-        issue_obj = self.get_issue(subject["repo"], subject["issue_id"])
-        existing_labels = []
-        if mutex:
-            for item in issue_obj.get_labels():
-                existing_labels.append(item.name)
+        group_labels = []
         for label_group in self.label_list:
             if label_group["group"] == group:
-                for item in label_group["labels"]:
-                    if item == label:
-                        issue_obj.add_to_labels(label)
-                        time.sleep(self.write_interval)
-                    else:
-                        if item in existing_labels:
-                            issue_obj.remove_from_labels(item)
-                            time.sleep(self.write_interval)
+                group_labels += label_group["labels"]
+        if label not in group_labels and not mutex:
+            return
+        issue_obj = self.get_issue(subject["repo"], subject["issue_id"])
+        new_labels = []
+        for item in issue_obj.labels:
+            # A mutex removes the other labels of the group, even if the
+            # label isn't in it.
+            if mutex and item.name in group_labels and item.name != label:
+                continue
+            new_labels.append(item.name)
+        if label in group_labels and label not in new_labels:
+            new_labels.append(label)
+        if self.replace_labels(issue_obj, new_labels):
+            time.sleep(self.write_interval)
 
     def _remove_label(self, subject, label):
         issue_obj = self.get_issue(subject["repo"], subject["issue_id"])
@@ -0,0 +1,231 @@
+# -*- coding: UTF-8 -*-
+
+import json
+
+import requests
+
+from githubutil import ratelimit
+from githubutil.transport import GithubConnection
+
+GRAPHQL_ENDPOINT = "https://api.github.com/graphql"
+# Searches in one aliased query.
+SEARCH_BATCH = 20
+
+_PR_FIELDS = """
+    number
+    url
+    merged
+    baseRefName
+    headRefName
+    author { login }
+    files(first: 100) {
+        pageInfo { hasNextPage endCursor }
+        nodes { path }
+    }
+    comments(first: 100) {
+        pageInfo { hasNextPage endCursor }
+        nodes { body }
+    }
+"""
+
+_SEARCH_PR_QUERY = """
+query($query: String!, $first: Int!, $after: String) {
+    search(type: ISSUE, query: $query, first: $first, after: $after) {
+        pageInfo { hasNextPage endCursor }
+        nodes { ... on PullRequest { %s } }
+    }
+}
+""" % _PR_FIELDS
+
+_PR_CONNECTION_QUERY = """
+query($owner: String!, $name: String!, $number: Int!, $after: String) {
+    repository(owner: $owner, name: $name) {
+        pullRequest(number: $number) {
+            %s(first: 100, after: $after) {
+                pageInfo { hasNextPage endCursor }
+                nodes { %s }
+            }
+        }
+    }
+}
+"""
+
+_ISSUE_FIELDS = """
+    number
+    title
+    url
+    assignees(first: 1) { nodes { login } }
+    labels(first: 100) { nodes { name } }
+"""
+
+
+class GraphqlError(Exception):
+    pass
+
+
+class GraphqlClient:
+    """
+    Github GraphQL API, requests go through the rate limit scheduler of
+    the token and the pooled sessions of ``githubutil.transport``.
+    """
+    _token = ""
+    _endpoint = GRAPHQL_ENDPOINT
+    _timeout = 30
+
+    def __init__(self, token, endpoint=None, timeout=30):
+        """
+        :param token: Github token.
+        :param endpoint: URL of the GraphQL API, e.g. of Github Enterprise
+        or a fake server, defaults to ``GRAPHQL_ENDPOINT``.
+        :param timeout: Seconds to wait for a response.
+        """
+        self._token = token
+        if endpoint:
+            self._endpoint = endpoint
+        self._timeout = timeout
+
+    def query(self, query, variables=None):
+        """
+        :return: The "data" of the response.
+        :rtype: dict
+        """
+        headers = {"Content-Type": "application/json"}
+        if self._token:
+            headers["Authorization"] = "bearer {}".format(self._token)
+        scheduler = ratelimit.get_scheduler(self._token)
+        scheduler.acquire("graphql")
+        session = GithubConnection.sessions.checkout(requests.Session)
+        try:
+            response = session.post(
+                self._endpoint, headers=headers, timeout=self._timeout,
+                data=json.dumps({"query": query,
+                                 "variables": variables or {}}))
+        finally:
+            GithubConnection.sessions.checkin(session)
+        scheduler.update("graphql", response.status_code,
+                         {name.lower(): value
+                          for name, value in response.headers.items()})
+        if response.status_code != 200:
+            raise GraphqlError("HTTP {}: {}".format(response.status_code,
+                                                    response.text))
+        result = response.json()
+        if result.get("errors"):
+            raise GraphqlError("; ".join(
+                [error.get("message", "") for error in result["errors"]]))
+        return result["data"]
+
+    def check_limit(self, minimum=1):
+        """
+        Sleep until the reset if less than ``minimum`` GraphQL requests
+        are left.
+        """
+        if minimum > 0:
+            ratelimit.get_scheduler(self._token).wait("graphql", minimum)
+
+    def _fetch_rest(self, repo_name, number, connection, fields, page_info):
+        """
+        Rest of a paginated connection of a pull request.
+
+        :return: List of nodes.
+        """
+        owner, name = repo_name.split("/", 1)
+        query = _PR_CONNECTION_QUERY % (connection, fields)
+        result = []
+        while page_info["hasNextPage"]:
+            data = self.query(query, {"owner": owner, "name": name,
+                                      "number": number,
+                                      "after": page_info["endCursor"]})
+            nodes = data["repository"]["pullRequest"][connection]
+            result += nodes["nodes"]
+            page_info = nodes["pageInfo"]
+        return result
+
+    def search_pull_requests(self, repo_name, query, page_size=20):
+        """
+        Search pull requests with their files, merge state, refs and
+        comments, ``page_size`` of them in one request.
+
+        :param repo_name: Repository of the pull requests, "owner/name".
+        :param query: Github search query.
+        :return: List of dicts with "number", "url", "merged", "base",
+        "head", "owner", "files" and "comments" (bodies).
+        :rtype: list of dict
+        """
+        result = []
+        after = None
+        while True:
+            data = self.query(_SEARCH_PR_QUERY, {"query": query,
+                                                 "first": page_size,
+                                                 "after": after})
+            for node in data["search"]["nodes"]:
+                if "number" not in node:
+                    # Not a pull request.
+                    continue
+                files = [item["path"] for item in node["files"]["nodes"]]
+                files += [item["path"] for item in self._fetch_rest(
+                    repo_name, node["number"], "files", "path",
+                    node["files"]["pageInfo"])]
+                comments = [item["body"]
+                            for item in node["comments"]["nodes"]]
+                comments += [item["body"] for item in self._fetch_rest(
+                    repo_name, node["number"], "comments", "body",
+                    node["comments"]["pageInfo"])]
+                result.append({
+                    "number": node["number"],
+                    "url": node["url"],
+                    "merged": node["merged"],
+                    "base": node["baseRefName"],
+                    "head": node["headRefName"],
+                    "owner": (node.get("author") or {}).get("login"),
+                    "files": files,
+                    "comments": comments,
+                })
+            page_info = data["search"]["pageInfo"]
+            if not page_info["hasNextPage"]:
+                return result
+            after = page_info["endCursor"]
+
+    def search_issues(self, queries, first=10):
+        """
+        Run many issue searches in aliased queries, ``SEARCH_BATCH`` of
+        them per request.
+
+        :param queries: Search queries by key.
+        :type queries: dict
+        :param first: Max issues of a search.
+        :return: Issues of each key, dicts with "number", "title", "url",
+        "assignee" (login or None) and "labels".
+        :rtype: dict
+        """
+        keys = list(queries.keys())
+        result = {}
+        for start in range(0, len(keys), SEARCH_BATCH):
+            batch = keys[start:start + SEARCH_BATCH]
+            params = []
+            fields = []
+            variables = {}
+            for index, key in enumerate(batch):
+                params.append("$q{}: String!".format(index))
+                fields.append(
+                    "s{0}: search(type: ISSUE, query: $q{0}, first: {1}) "
+                    "{{ nodes {{ ... on Issue {{ {2} }} }} }}".format(
+                        index, first, _ISSUE_FIELDS))
+                variables["q{}".format(index)] = queries[key]
+            data = self.query("query({}) {{ {} }}".format(
+                ", ".join(params), "\n".join(fields)), variables)
+            for index, key in enumerate(batch):
+                result[key] = []
+                for node in data["s{}".format(index)]["nodes"]:
+                    if "number" not in node:
+                        continue
+                    assignees = node["assignees"]["nodes"]
+                    result[key].append({
+                        "number": node["number"],
+                        "title": node["title"],
+                        "url": node["url"],
+                        "assignee": assignees[0]["login"] if assignees
+                        else None,
+                        "labels": [item["name"]
+                                   for item in node["labels"]["nodes"]],
+                    })
+        return result
@@ -0,0 +1,245 @@
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_MAX_ENTRIES = 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    entry TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at);
+"""
+
+_cache = None
+
+
+class MemoryStore:
+    """
+    Least recently used entries in memory, of one process.
+    """
+    _max_entries = DEFAULT_MAX_ENTRIES
+    _entries = None
+    _lock = None
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """
+        :return: The entry, None if it's not cached.
+        :rtype: dict
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskStore:
+    """
+    Least recently used entries in a SQLite file, kept across restarts
+    and shared by processes on the same disk.
+    """
+    _max_entries = DEFAULT_MAX_ENTRIES
+    _connection = None
+    _lock = None
+
+    def __init__(self, file_name, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param file_name: SQLite database file, created if it's missing.
+        :type file_name: str
+        """
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file_name,
+                                           check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+    def get(self, key):
+        """
+        :return: The entry, None if it's not cached.
+        :rtype: dict
+        """
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT entry FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE responses SET used_at = ? WHERE key = ?",
+                (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, entry):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, entry, used_at) "
+                "VALUES (?, ?, ?)", (key, json.dumps(entry), time.time()))
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY used_at DESC "
+                "LIMIT -1 OFFSET ?)", (self._max_entries,))
+
+
+class CachedResponse:
+    """
+    Cached 200 response, mimics ``github.Requester.RequestsResponse``.
+    """
+    status = 200
+    headers = None
+    _body = ""
+
+    def __init__(self, entry):
+        self.headers = CaseInsensitiveDict(entry["headers"])
+        self._body = entry["body"]
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self):
+        return self._body
+
+    def iter_content(self, chunk_size=1):
+        return iter([self._body.encode("utf-8")])
+
+    def raise_for_status(self):
+        pass
+
+
+class ResponseCache:
+    """
+    GET responses with an ETag or Last-Modified, revalidated with
+    conditional requests: a 304 costs no rate limit, and the cached
+    response is served for it.
+    """
+    _store = None
+
+    def __init__(self, store):
+        """
+        :type store: MemoryStore or DiskStore
+        """
+        self._store = store
+
+    @staticmethod
+    def get_key(token, url, accept=""):
+        """
+        Responses differ by the token, the URL and the media type.
+
+        :param token: Github token, or the key of an Authorization header.
+        :param url: Host and path of the request.
+        """
+        return "{} {} {}".format(
+            hashlib.sha256((token or "").encode("utf-8")).hexdigest(),
+            url, accept or "")
+
+    def prepare(self, key, headers):
+        """
+        Add the validators of the cached response to the request headers.
+
+        :param headers: Request headers, changed in place.
+        :type headers: dict
+        :return: The cached entry, None if it's not cached, or the caller
+        validates by itself.
+        :rtype: dict
+        """
+        for name in headers.keys():
+            if name.lower() in ("if-none-match", "if-modified-since"):
+                return None
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return entry
+
+    def update(self, key, entry, response):
+        """
+        :param entry: Entry returned by ``prepare``.
+        :param response: Response of the request.
+        :return: The cached response for a 304, the response otherwise.
+        """
+        if response.status == 304 and entry is not None:
+            return CachedResponse(entry)
+        if response.status != 200:
+            return response
+        headers = dict(response.getheaders())
+        validators = CaseInsensitiveDict(headers)
+        etag = validators.get("etag")
+        last_modified = validators.get("last-modified")
+        if etag or last_modified:
+            self._store.put(key, {
+                "etag": etag,
+                "last_modified": last_modified,
+                "headers": headers,
+                "body": response.read(),
+            })
+        return response
+
+
+def configure(spec):
+    """
+    Set the cache of all Github clients in the process.
+
+    :param spec: "" for no cache, "memory[:max_entries]", or
+    "disk:file_name[:max_entries]".
+    :rtype: ResponseCache
+    """
+    global _cache
+    parts = (spec or "").split(":")
+    kind = parts[0].strip().lower()
+    if kind == "":
+        _cache = None
+    elif kind == "memory":
+        max_entries = int(parts[1]) if len(parts) > 1 else \
+            DEFAULT_MAX_ENTRIES
+        _cache = ResponseCache(MemoryStore(max_entries))
+    elif kind == "disk" and len(parts) > 1:
+        max_entries = int(parts[2]) if len(parts) > 2 else \
+            DEFAULT_MAX_ENTRIES
+        _cache = ResponseCache(DiskStore(parts[1], max_entries))
+    else:
+        raise ValueError("Unknown Github cache: {}".format(spec))
+    return _cache
+
+
+def get_cache():
+    """
+    :return: The configured cache, None if caching is off.
+    :rtype: ResponseCache
+    """
+    return _cache
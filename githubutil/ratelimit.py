@@ -0,0 +1,235 @@
+# -*- coding: UTF-8 -*-
+
+import hashlib
+import logging
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Secondary rate limits of the REST API: 900 points per minute, a GET
+# costs 1 point and a request changing content costs 5.
+POINTS_PER_MINUTE = 900
+READ_POINTS = 1
+WRITE_POINTS = 5
+# Reset times and Date headers are whole seconds.
+RESET_MARGIN = 1
+
+_schedulers = {}
+_lock = threading.Lock()
+
+
+def get_resource(url):
+    """
+    Rate limit resource a request is counted in, as the
+    X-RateLimit-Resource header names them.
+
+    :param url: Path of the request.
+    :rtype: str
+    """
+    path = url.split("?", 1)[0]
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/code" in path:
+        return "code_search"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+
+def get_key(authorization):
+    """
+    Scheduler key of an Authorization header, e.g. "token xxx" -> "xxx".
+    """
+    return (authorization or "").split(" ", 1)[-1]
+
+
+class TokenBucket:
+    """
+    Tokens refill at a constant rate up to the capacity, a caller takes
+    tokens in advance and waits for the debt to be paid back.
+    """
+    _rate = 0
+    _capacity = 0
+    _tokens = 0
+    _updated = 0
+
+    def __init__(self, rate, capacity):
+        """
+        :param rate: Tokens per second.
+        :param capacity: Max tokens.
+        """
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def take(self, count=1):
+        """
+        :return: Seconds to wait before using the tokens.
+        :rtype: float
+        """
+        now = time.monotonic()
+        self._tokens = min(self._capacity,
+                           self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+        self._tokens -= count
+        if self._tokens >= 0:
+            return 0
+        return -self._tokens / self._rate
+
+
+class RateLimitScheduler:
+    """
+    Rate limit budgets of one token, learned from the X-RateLimit-* and
+    Retry-After headers of the responses, no request is sent for them.
+    """
+    _budgets = None
+    _blocked_until = 0
+    _skew = 0
+    _points = None
+    _lock = None
+
+    def __init__(self):
+        self._budgets = {}
+        self._points = TokenBucket(POINTS_PER_MINUTE / 60.0,
+                                   POINTS_PER_MINUTE)
+        self._lock = threading.Lock()
+
+    def _server_time(self):
+        return time.time() + self._skew
+
+    def get_server_time(self, timestamp=None):
+        """
+        :param timestamp: Local epoch seconds, defaults to now.
+        :return: Epoch seconds of the Github server at ``timestamp``, by
+        the Date header of the last response.
+        :rtype: float
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            return timestamp + self._skew
+
+    def get_budget(self, resource):
+        """
+        :param resource: "core", "search", "graphql"...
+        :return: Dict with "limit", "remaining" and "reset" (epoch
+        seconds), None if no response told it yet.
+        :rtype: dict
+        """
+        with self._lock:
+            budget = self._budgets.get(resource)
+            return None if budget is None else dict(budget)
+
+    def _wait_for_reset(self, budget):
+        return max(budget["reset"] - self._server_time(), 0) + RESET_MARGIN
+
+    def acquire(self, resource, verb="GET"):
+        """
+        Wait until a request can be sent, sleeps only if a budget is
+        exhausted, Github asked to retry later, or requests come faster
+        than the secondary limits allow.
+
+        :param resource: Rate limit resource of the request.
+        :param verb: HTTP method of the request.
+        """
+        with self._lock:
+            wait = self._blocked_until - time.time()
+            budget = self._budgets.get(resource)
+            if budget is not None:
+                if budget["remaining"] <= 0 and \
+                        budget["reset"] > self._server_time():
+                    wait = max(wait, self._wait_for_reset(budget))
+                    # A new window starts after the reset.
+                    budget["remaining"] = budget["limit"]
+                budget["remaining"] -= 1
+            if verb.upper() in ("GET", "HEAD"):
+                cost = READ_POINTS
+            else:
+                cost = WRITE_POINTS
+            wait = max(wait, self._points.take(cost))
+        if wait > 0:
+            logging.info("Waiting {} limits for {:.1f} seconds.".format(
+                resource, wait))
+            time.sleep(wait)
+
+    def refund(self, resource):
+        """
+        Give back a request taken by ``acquire`` which Github didn't count,
+        e.g. a 304 to a conditional request.
+        """
+        with self._lock:
+            budget = self._budgets.get(resource)
+            if budget is not None:
+                budget["remaining"] = min(budget["remaining"] + 1,
+                                          budget["limit"])
+
+    def update(self, resource, status, headers):
+        """
+        Learn the budgets from a response.
+
+        :param resource: Rate limit resource of the request.
+        :param status: HTTP status code.
+        :param headers: Response headers, names in lower case.
+        :type headers: dict
+        """
+        with self._lock:
+            if "date" in headers:
+                try:
+                    self._skew = parsedate_to_datetime(
+                        headers["date"]).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    pass
+            resource = headers.get("x-ratelimit-resource", resource)
+            if "x-ratelimit-remaining" in headers:
+                try:
+                    budget = {
+                        "limit": int(headers["x-ratelimit-limit"]),
+                        "remaining": int(headers["x-ratelimit-remaining"]),
+                        "reset": int(headers["x-ratelimit-reset"]),
+                    }
+                except (KeyError, ValueError):
+                    budget = None
+                old = self._budgets.get(resource)
+                if budget is not None:
+                    if old is not None and old["reset"] == budget["reset"]:
+                        # Requests in flight are already counted.
+                        budget["remaining"] = min(budget["remaining"],
+                                                  old["remaining"])
+                    self._budgets[resource] = budget
+            if status in (403, 429) and "retry-after" in headers:
+                try:
+                    self._blocked_until = max(
+                        self._blocked_until,
+                        time.time() + float(headers["retry-after"]))
+                except ValueError:
+                    pass
+
+    def wait(self, resource, minimum=1):
+        """
+        Sleep until the reset if less than ``minimum`` requests are left,
+        unknown budgets don't wait.
+        """
+        with self._lock:
+            budget = self._budgets.get(resource)
+            if budget is None or budget["remaining"] >= minimum or \
+                    budget["reset"] <= self._server_time():
+                return
+            wait = self._wait_for_reset(budget)
+        logging.warning(
+            "Waiting {} limits for {:.1f} seconds.".format(resource, wait))
+        time.sleep(wait)
+
+
+def get_scheduler(token=""):
+    """
+    Scheduler shared by all the clients of the token in the process.
+
+    :param token: Github token, or the key of an Authorization header.
+    :rtype: RateLimitScheduler
+    """
+    key = hashlib.sha256((token or "").encode("utf-8")).hexdigest()
+    with _lock:
+        if key not in _schedulers:
+            _schedulers[key] = RateLimitScheduler()
+        return _schedulers[key]
@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+
+import time
+
+from githubutil import ratelimit
+
+# Tokens without a response yet are tried first, so their budgets get known.
+UNKNOWN_BUDGET = float("inf")
+
+
+class TokenPool:
+    """
+    Tokens to spread read-only requests over, the token with the most
+    budget left is picked, as the rate limit schedulers know it.
+    """
+    _tokens = None
+
+    def __init__(self, tokens):
+        """
+        :type tokens: list of str
+        """
+        self._tokens = []
+        for token in tokens:
+            if token and token not in self._tokens:
+                self._tokens.append(token)
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def get_remaining(self, token, resource="core"):
+        """
+        :return: Requests the token has left for the resource.
+        :rtype: float
+        """
+        budget = ratelimit.get_scheduler(token).get_budget(resource)
+        if budget is None:
+            return UNKNOWN_BUDGET
+        if budget["reset"] <= time.time():
+            return budget["limit"]
+        return budget["remaining"]
+
+    def pick(self, resource="core"):
+        """
+        :param resource: "core", "search" or "graphql".
+        :return: Token with the most budget left, None if the pool is
+        empty.
+        :rtype: str
+        """
+        result = None
+        result_remaining = -1
+        for token in self._tokens:
+            remaining = self.get_remaining(token, resource)
+            if remaining > result_remaining:
+                result = token
+                result_remaining = remaining
+        return result
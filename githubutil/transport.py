@@ -0,0 +1,139 @@
+# -*- coding: UTF-8 -*-
+
+import threading
+
+import github
+from github.Requester import HTTPRequestsConnectionClass, \
+    HTTPSRequestsConnectionClass, Requester
+
+from githubutil import httpcache, ratelimit
+
+# Most items a Github list API returns in one page, PyGithub asks for 30.
+PER_PAGE = 100
+
+_clients = {}
+_lock = threading.Lock()
+
+
+class SessionPool:
+    """
+    Idle requests sessions, a request checks one out and returns it, so
+    concurrent requests never share a session while keep-alive
+    connections and TLS sessions live on between them.
+    """
+    _idle = None
+    _lock = None
+
+    def __init__(self):
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def checkout(self, factory):
+        """
+        :param factory: Creates a session when no one is idle.
+        :rtype: requests.Session
+        """
+        with self._lock:
+            if len(self._idle) > 0:
+                return self._idle.pop()
+        return factory()
+
+    def checkin(self, session):
+        with self._lock:
+            self._idle.append(session)
+
+
+class GithubConnection(HTTPSRequestsConnectionClass):
+    """
+    PyGithub connection which waits for the rate limit scheduler of the
+    request's token before sending, and feeds the response headers back
+    to it. GET requests are revalidated against the response cache when
+    one is configured.
+    """
+    # PyGithub creates a connection per request once the connection
+    # classes are injected, the sessions are pooled across them.
+    sessions = SessionPool()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # A session with the adapter set up by PyGithub, used when the
+        # pool has no idle one.
+        self._new_session = self.session
+        self.session = None
+
+    def _send(self):
+        """
+        Send the request with a pooled session.
+
+        :rtype: github.Requester.RequestsResponse
+        """
+        self.session = GithubConnection.sessions.checkout(
+            lambda: self._new_session)
+        if self.session is not self._new_session:
+            self._new_session.close()
+        try:
+            return super().getresponse()
+        finally:
+            GithubConnection.sessions.checkin(self.session)
+            self.session = None
+
+    def getresponse(self):
+        key = ""
+        for name, value in self.headers.items():
+            if name.lower() == "authorization":
+                key = ratelimit.get_key(value)
+        scheduler = ratelimit.get_scheduler(key)
+        resource = ratelimit.get_resource(self.url)
+        cache = httpcache.get_cache()
+        if self.verb.upper() != "GET" or self.stream:
+            cache = None
+        if cache is not None:
+            self.headers = dict(self.headers)
+            accept = ""
+            for name, value in self.headers.items():
+                if name.lower() == "accept":
+                    accept = value
+            cache_key = cache.get_key(key, self.host + self.url, accept)
+            entry = cache.prepare(cache_key, self.headers)
+        scheduler.acquire(resource, self.verb)
+        response = self._send()
+        scheduler.update(resource, response.status,
+                         {name.lower(): value
+                          for name, value in response.getheaders()})
+        if response.status == 304:
+            scheduler.refund(resource)
+        if cache is not None:
+            response = cache.update(cache_key, entry, response)
+        return response
+
+    def close(self):
+        # The sessions are pooled.
+        pass
+
+
+def install():
+    """
+    Send the requests of all PyGithub clients through GithubConnection.
+    """
+    Requester.injectConnectionClasses(HTTPRequestsConnectionClass,
+                                      GithubConnection)
+
+
+def get_client(token, lazy=False):
+    """
+    Github client shared by all the callers of the token in the process,
+    clients are safe to use from several threads.
+
+    :type token: str
+    :param lazy: Objects got by the client are not fetched until their
+    attributes are read.
+    :type lazy: bool
+    :rtype: github.Github
+    """
+    install()
+    key = (token, lazy)
+    with _lock:
+        if key not in _clients:
+            _clients[key] = github.Github(token, lazy=lazy,
+                                          per_page=PER_PAGE)
+        return _clients[key]
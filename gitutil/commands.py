@@ -1,26 +1,60 @@
+import asyncio
+import logging
+import os
 import subprocess
 import re
-import os
+
+from gitutil.index import GitIndex, UnsupportedIndex
+
+# Paths in one ``git diff`` command, keeps the command line short.
+DIFF_BATCH_SIZE = 200
 
 
 class GitCommand:
     __repo_path = ""
     __git_path = "git"
+    __read_index = False
+    __empty_tree = None
 
-    def __init__(self, path, git="git"):
+    def __init__(self, path, git="git", read_index=False):
+        """
+        :param path: Path of the working tree.
+        :param git: Executable git path.
+        :param read_index: List files by reading ``.git/index`` in process.
+        :type read_index: bool
+        """
         self.__repo_path = path
         self.__git_path = git
+        self.__read_index = read_index
 
     def __command_wrapper(self, command):
-        cwd = os.getcwd()
-        os.chdir(self.__repo_path)
         try:
-            output = subprocess.check_output([self.__git_path] + command)
+            output = subprocess.check_output([self.__git_path] + command,
+                                             cwd=self.__repo_path)
             return output.decode("utf-8")
         except subprocess.CalledProcessError:
             return None
+
+    def __iter_fields(self, command):
+        """
+        Run a git command with ``-z`` output and stream the NUL separated
+        fields without keeping the whole output in memory.
+
+        :rtype: generator of bytes
+        """
+        process = subprocess.Popen([self.__git_path] + command,
+                                   cwd=self.__repo_path,
+                                   stdout=subprocess.PIPE)
+        remains = b""
+        try:
+            for chunk in iter(lambda: process.stdout.read(65536), b""):
+                fields = (remains + chunk).split(b"\0")
+                remains = fields.pop()
+                for field in fields:
+                    yield field
         finally:
-            os.chdir(cwd)
+            process.stdout.close()
+            process.wait()
 
     def list_branches(self, command=None, pattern=r"origin/release.*?$"):
         if command is None:
@@ -43,10 +77,113 @@ class GitCommand:
         mat = re.match(r"^(.*?)\s+.*?$", output.strip())
         return mat[1]
 
-    def list_files(self):
-        command = ["ls-files"]
-        lines = (self.__command_wrapper(command)).strip().split("\n")
-        return lines
+    def list_files(self, paths=None, extensions=None):
+        """
+        Stream ``git ls-files -z``, git does the filtering.
+
+        :param paths: Only list files in these paths.
+        :type paths: list of str
+        :param extensions: Only list files with these extensions, e.g. ".md".
+        :type extensions: list of str
+        :return: Generator of file names.
+        """
+        if _is_empty_filter(paths, extensions):
+            return
+        if self.__read_index:
+            for file_name, _ in self.list_blobs(paths, extensions):
+                yield file_name
+            return
+        command = ["ls-files", "-z", "--"] + _pathspec(paths, extensions)
+        for field in self.__iter_fields(command):
+            yield field.decode("utf-8")
+
+    def list_blobs(self, paths=None, extensions=None):
+        """
+        Files in the index with their blob ids, from the ``.git/index``
+        file directly when ``read_index`` is enabled.
+
+        :param paths: Only list files in these paths.
+        :type paths: list of str
+        :param extensions: Only list files with these extensions, e.g. ".md".
+        :type extensions: list of str
+        :return: Generator of (file name, blob id).
+        """
+        if _is_empty_filter(paths, extensions):
+            return
+        if self.__read_index:
+            try:
+                entries = GitIndex(self.__repo_path).entries()
+            except (UnsupportedIndex, OSError, ValueError) as e:
+                logging.info("Fall back to git ls-files: {}".format(e))
+            else:
+                for file_name, blob_id in entries:
+                    if _match_pathspec(file_name, paths, extensions):
+                        yield file_name, blob_id
+                return
+        command = ["ls-files", "-s", "-z", "--"] + \
+            _pathspec(paths, extensions)
+        for field in self.__iter_fields(command):
+            # <mode> SP <object> SP <stage> TAB <file>
+            info, file_name = field.decode("utf-8").split("\t", 1)
+            yield file_name, info.split(" ")[1]
+
+    def get_head(self):
+        """
+        :return: Full object id of HEAD.
+        :rtype: str
+        """
+        return self.get_object_id("HEAD")
+
+    def is_ancestor(self, ancestor, descendant="HEAD"):
+        """
+        :rtype: bool
+        """
+        command = ["merge-base", "--is-ancestor", ancestor, descendant]
+        return self.__command_wrapper(command) is not None
+
+    def iter_log(self, paths=None, rev="HEAD"):
+        """
+        Stream ``git log --name-only`` in a single process.
+
+        Renames are listed as a deleted and an added file whatever
+        ``diff.renames`` is. Merge commits list no files, as ``git log``
+        shows no diff for them, so a merge is never the commit touching a
+        file, ``HistoryIndex`` relies on that.
+
+        :param paths: Only walk history touching these paths.
+        :type paths: list of str
+        :param rev: Start of the walk.
+        :return: Generator of (abbreviated hash, commit time, author time,
+        list of changed files), newest first.
+        """
+        command = ["log", "--format=%x01%h %ct %at",
+                   "--name-only", "--no-renames", "-z", rev, "--"]
+        if paths is not None:
+            command += paths
+        record = None
+        for field in self.__iter_fields(command):
+            field = field.lstrip(b"\n")
+            if field.startswith(b"\x01"):
+                if record is not None:
+                    yield record
+                commit, commit_time, author_time = \
+                    field[1:].decode("utf-8").split(" ")
+                record = (commit, int(commit_time), int(author_time), [])
+            elif len(field) > 0:
+                record[3].append(field.decode("utf-8"))
+        if record is not None:
+            yield record
+
+    def get_object_id(self, rev):
+        """
+        Resolve a revision (``HEAD``, ``HEAD:path``...) to a full object id.
+
+        :rtype: str
+        """
+        output = self.__command_wrapper(["rev-parse", "--verify", "-q", rev])
+        if output is None or len(output.strip()) == 0:
+            return None
+        return output.strip()
 
     def get_hash_time(self, hashcode):
         command = [
@@ -64,13 +201,227 @@ class GitCommand:
         ]
         return self.__command_wrapper(command).strip()
 
+    def get_empty_tree(self):
+        """
+        :return: Id of the empty tree, in the hash algorithm of the
+        repository.
+        :rtype: str
+        """
+        if self.__empty_tree is None:
+            self.__empty_tree = self.__command_wrapper(
+                ["hash-object", "-t", "tree", os.devnull]).strip()
+        return self.__empty_tree
+
     def get_diff_by_hash(self, filename, new_hashcode, old_hashcode):
+        """
+        :param old_hashcode: None diffs against the empty tree, the whole
+        file is removed.
+        """
+        if old_hashcode is None:
+            old_hashcode = self.get_empty_tree()
         command = [
             "diff", new_hashcode, old_hashcode,
             filename
         ]
         return self.__command_wrapper(command).strip()
 
+    def iter_diffs(self, triples, max_size=0):
+        """
+        Diff many files with one ``git diff`` per distinct pair of
+        commits, the paths of a pair are passed together.
+
+        The diff of a file is the same as ``get_diff_by_hash`` gives: from
+        the file in ``new_hashcode`` to the file in ``old_hashcode``.
+
+        :param triples: Iterable of (file name, new hashcode, old hashcode),
+        an old hashcode of None is the empty tree.
+        :param max_size: Truncate the diff of a file to this many
+        characters, 0 means no limit.
+        :type max_size: int
+        :return: Generator of (file name, diff), in the order of the
+        commit pairs.
+        """
+        pairs = {}
+        for filename, new_hashcode, old_hashcode in triples:
+            if old_hashcode is None:
+                old_hashcode = self.get_empty_tree()
+            pairs.setdefault((new_hashcode, old_hashcode), []).append(
+                filename)
+        for (new_hashcode, old_hashcode), file_names in pairs.items():
+            for start in range(0, len(file_names), DIFF_BATCH_SIZE):
+                chunk = file_names[start:start + DIFF_BATCH_SIZE]
+                output = self.__command_wrapper(
+                    ["diff", "--no-renames", new_hashcode, old_hashcode,
+                     "--"] + chunk)
+                diffs = _split_diff(output or "")
+                for filename in chunk:
+                    diff = diffs.get(_diff_header(filename), "").strip()
+                    yield filename, _truncate_diff(diff, max_size)
+
+    def get_diffs_by_hash(self, triples, max_size=0):
+        """
+        :return: Diffs of ``iter_diffs`` keyed by file name.
+        :rtype: dict
+        """
+        return dict(self.iter_diffs(triples, max_size))
+
     def pull(self):
         command = ["pull"]
         return self.__command_wrapper(command).strip()
+
+    def clone(self, url, path, bare=False):
+        """
+        Clone a repository into ``path``, relative to the working tree
+        of this commander.
+        """
+        command = ["clone"]
+        if bare:
+            command.append("--bare")
+        return self.__command_wrapper(command + [url, path])
+
+    def set_config(self, key, value):
+        return self.__command_wrapper(["config", key, value])
+
+    def fetch(self, remote="origin"):
+        return self.__command_wrapper(["fetch", "--prune", remote])
+
+    def list_worktrees(self):
+        """
+        :return: Absolute paths of the worktrees.
+        :rtype: list of str
+        """
+        output = self.__command_wrapper(["worktree", "list", "--porcelain"])
+        return [line[len("worktree "):] for line in output.split("\n")
+                if line.startswith("worktree ")]
+
+    def add_worktree(self, path, branch, start_point):
+        """
+        Check out ``start_point`` as the local ``branch`` in a new worktree.
+        """
+        command = ["worktree", "add", "-B", branch, path, start_point]
+        return self.__command_wrapper(command)
+
+    def merge_ff_only(self, rev):
+        return self.__command_wrapper(["merge", "--ff-only", rev])
+
+    def pull_ff_only(self):
+        return self.__command_wrapper(["pull", "--ff-only"])
+
+    async def pull_async(self, timeout=None):
+        """
+        ``git pull`` without blocking the event loop.
+
+        :param timeout: Seconds to wait before killing the process.
+        :return: Output of the command, None if it failed.
+        :raise asyncio.TimeoutError: The command timed out.
+        """
+        process = await asyncio.create_subprocess_exec(
+            self.__git_path, "pull", cwd=self.__repo_path,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise
+        if process.returncode != 0:
+            return None
+        return output.decode("utf-8").strip()
+
+
+def _is_empty_filter(paths=None, extensions=None):
+    """
+    An empty path or extension list matches nothing, while an empty
+    pathspec would match every file.
+    """
+    return (paths is not None and len(paths) == 0) or \
+        (extensions is not None and len(extensions) == 0)
+
+
+def _pathspec(paths=None, extensions=None):
+    if extensions is None:
+        return [":(literal)" + path for path in (paths or [])]
+    return ["{}*{}".format(path + "/", ext).lstrip("/")
+            for path in (paths or [""])
+            for ext in extensions]
+
+
+def _match_pathspec(file_name, paths=None, extensions=None):
+    """
+    Same as matching ``file_name`` with ``_pathspec(paths, extensions)``.
+    """
+    if extensions is not None:
+        if not file_name.endswith(tuple(extensions)):
+            return False
+        if paths is None:
+            return True
+        return file_name.startswith(tuple([path + "/" for path in paths]))
+    if paths is None:
+        return True
+    for path in paths:
+        if file_name == path or file_name.startswith(path.rstrip("/") + "/"):
+            return True
+    return False
+
+
+def _quote_path(file_name):
+    """
+    Quote a path the way git does with the default ``core.quotePath``.
+    """
+    escapes = {7: "a", 8: "b", 9: "t", 10: "n", 11: "v", 12: "f", 13: "r",
+               34: '"', 92: "\\"}
+    result = []
+    quoted = False
+    for byte in file_name.encode("utf-8"):
+        if byte in escapes:
+            result.append("\\" + escapes[byte])
+            quoted = True
+        elif byte < 0x20 or byte >= 0x7f:
+            result.append("\\{:03o}".format(byte))
+            quoted = True
+        else:
+            result.append(chr(byte))
+    return '"{}"'.format("".join(result)) if quoted else "".join(result)
+
+
+def _diff_header(file_name):
+    """
+    First line of the diff of a file in ``git diff`` output.
+    """
+    return "diff --git {} {}".format(_quote_path("a/" + file_name),
+                                     _quote_path("b/" + file_name))
+
+
+def _split_diff(output):
+    """
+    :param output: Output of ``git diff``.
+    :return: Diff of each file keyed by its header line.
+    :rtype: dict
+    """
+    result = {}
+    header = None
+    lines = []
+    for line in output.splitlines(True):
+        if line.startswith("diff --git "):
+            if header is not None:
+                result[header] = "".join(lines)
+            header = line.rstrip("\n")
+            lines = []
+        lines.append(line)
+    if header is not None:
+        result[header] = "".join(lines)
+    return result
+
+
+def _truncate_diff(diff, max_size=0):
+    """
+    Cut a diff at the last whole line within ``max_size`` characters,
+    0 means no limit.
+
+    :rtype: str
+    """
+    if max_size <= 0 or len(diff) <= max_size:
+        return diff
+    end = diff.rfind("\n", 0, max_size) + 1
+    return (diff[:end] + "\n... (diff truncated at {} characters)".format(
+        max_size)).strip()
@@ -1,32 +1,80 @@
 # -*- coding: UTF-8 -*-
 
-import yaml
-import copy
+from configutil import loader
+from configutil.patterns import PatternMatcher
+from types import MappingProxyType
+
+
+def _freeze(obj):
+    """
+    Read-only view of the parsed YAML: dicts become mapping proxies and
+    lists become tuples, so getters can share it without copying.
+    """
+    if isinstance(obj, dict):
+        return MappingProxyType({key: _freeze(value)
+                                 for key, value in obj.items()})
+    if isinstance(obj, list):
+        return tuple([_freeze(item) for item in obj])
+    return obj
 
 
 class Configuration:
     __configure_file = ""
     _configure_object = None
     _current_repository_name = ""
+    _repositories = None
 
     def __init__(self, configfile):
-        with open(configfile, "r") as handler:
-            self._configure_object = yaml.load(handler)
+        self._configure_object = loader.load(configfile)
+        self._compile()
+
+    @classmethod
+    def load(cls, configfile):
+        """
+        Shared instance for the file, rebuilt only when the file changes.
+        """
+        return loader.load_instance(configfile, cls)
+
+    def _compile(self):
+        """
+        Index the repositories once, getters only look up these views.
+        """
+        self._repositories = {}
+        for name, repo_data in self._configure_object["repositories"].items():
+            repo_data = _freeze(repo_data)
+            branches = {item["name"]: item for item in repo_data["branches"]}
+            ignore = {}
+            for branch_name, branch_item in branches.items():
+                ignore[branch_name] = PatternMatcher(
+                    branch_item.get("ignore", ()))
+            self._repositories[name] = {
+                "data": repo_data,
+                "branches": branches,
+                "languages": {item["name"]: item
+                              for item in repo_data["languages"]},
+                "extensions": frozenset(repo_data["valid_extensions"]),
+                "ignore": ignore,
+            }
 
     def _get_repository(self, repository_name):
-        return copy.deepcopy(self._configure_object["repositories"][repository_name])
+        return self._repositories[repository_name]["data"]
 
     def list_repository(self):
-        return list((self._configure_object["repositories"]).keys())
+        return list(self._repositories.keys())
 
     def get_repository(self, name):
-        return copy.deepcopy(self._configure_object["repositories"][name])
+        return self._get_repository(name)
 
     def get_ignore_re_list(self, repository_name, branch_name):
         branch_item = self.get_branch(repository_name, branch_name)
-        if "ignore" in branch_item.keys():
-            return copy.deepcopy(branch_item["ignore"])
-        return []
+        return branch_item.get("ignore", ())
+
+    def get_ignore_matcher(self, repository_name, branch_name):
+        """
+        :return: Matcher of all the ignore patterns of the branch.
+        :rtype: configutil.patterns.PatternMatcher
+        """
+        return self._repositories[repository_name]["ignore"][branch_name]
 
     def list_branch(self, repository_name):
         """
@@ -35,46 +83,39 @@ class Configuration:
         :param repository_name:
         :return: List of branch names.
         """
-        result = []
-        repo_data = self._get_repository(repository_name)
-        for item in repo_data["branches"]:
-            result.append(item["name"])
-        return result
+        return list(self._repositories[repository_name]["branches"].keys())
 
     def get_source(self, repository_name):
-        repo_data = self._get_repository(repository_name)
-        return copy.deepcopy(repo_data["source"])
+        return self._get_repository(repository_name)["source"]
 
     def get_branch(self, repository_name, branch_name):
-        repo_data = self._get_repository(repository_name)
-        branch_list = repo_data["branches"]
-        for branch_item in branch_list:
-            if branch_item["name"] == branch_name:
-                return copy.deepcopy(branch_item)
-        return None
+        return self._repositories[repository_name]["branches"].get(branch_name)
 
     def list_languages(self, repository_name):
-        result = []
-        repo_data = self._get_repository(repository_name)
-        for item in repo_data["languages"]:
-            result.append(item)
-        return result
+        return list(self._get_repository(repository_name)["languages"])
 
     def get_languages(self, repository_name, name):
-        repo_data = self._get_repository(repository_name)
-        for item in repo_data["languages"]:
-            if item["name"] == name:
-                return copy.deepcopy(item)
-        return None
+        return self._repositories[repository_name]["languages"].get(name)
 
     def get_status_label(self, repository_name, status):
-        repo_data = self.get_repository(repository_name)
-        if "status" not in repo_data.keys():
-            return None
-        if status not in repo_data["status"]:
-            return None
-        return copy.deepcopy(repo_data["status"][status])
+        return self._get_repository(repository_name).get(
+            "status", {}).get(status)
+
+    def get_mirror(self, repository_name):
+        """
+        Shared repository of the branch worktrees.
+
+        :return: Dict with "url" and "path", None if branches are
+        separated clones.
+        :rtype: dict
+        """
+        return self._get_repository(repository_name).get("mirror")
 
     def get_valid_extensions(self, repository_name):
-        repo_data = self._get_repository(repository_name)
-        return copy.deepcopy(repo_data["valid_extensions"])
+        return self._get_repository(repository_name)["valid_extensions"]
+
+    def get_extension_set(self, repository_name):
+        """
+        :rtype: frozenset of str
+        """
+        return self._repositories[repository_name]["extensions"]
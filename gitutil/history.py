@@ -0,0 +1,62 @@
+class HistoryIndex:
+    """
+    In-memory map of path -> commits touching it, built from one
+    ``git log --name-only`` walk, so per-file questions don't need a
+    ``git log`` process each.
+    """
+    _history = None
+    _commit_time = None
+
+    def __init__(self, git_command, paths=None):
+        """
+        :param git_command: Commander of the repository to index.
+        :type git_command: gitutil.commands.GitCommand
+        :param paths: Only index history of these paths.
+        :type paths: list of str
+        """
+        self._history = {}
+        self._commit_time = {}
+        for commit, commit_time, author_time, file_list in \
+                git_command.iter_log(paths):
+            self._commit_time[commit] = (commit_time, author_time)
+            for file_name in file_list:
+                self._history.setdefault(file_name, []).append(commit)
+
+    def list_commits(self, file_name):
+        """
+        Commits touching the file, newest first.
+
+        :rtype: list of str
+        """
+        return self._history.get(file_name, [])
+
+    def get_last_commit(self, file_name):
+        """
+        Same as ``git log -1 file_name``.
+
+        :rtype: str
+        """
+        commit_list = self.list_commits(file_name)
+        if len(commit_list) == 0:
+            return None
+        return commit_list[0]
+
+    def get_author_time(self, commit):
+        """
+        :return: Author time of the commit in seconds since the epoch.
+        :rtype: int
+        """
+        return self._commit_time[commit][1]
+
+    def get_commit_before(self, file_name, timestamp):
+        """
+        Same as ``git log -1 --before timestamp file_name``.
+
+        :param timestamp: Seconds since the epoch.
+        :type timestamp: int
+        :rtype: str
+        """
+        for commit in self.list_commits(file_name):
+            if self._commit_time[commit][0] <= timestamp:
+                return commit
+        return None
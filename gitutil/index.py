@@ -0,0 +1,113 @@
+import mmap
+import os
+import struct
+
+
+class UnsupportedIndex(Exception):
+    pass
+
+
+class GitIndex:
+    """
+    Read-only reader of the ``.git/index`` file (version 2, 3 and 4), so
+    a listing needs no git process.
+    """
+    _index_file = ""
+    _hash_size = 20
+
+    def __init__(self, repo_path):
+        """
+        :param repo_path: Path of the working tree.
+        :type repo_path: str
+        """
+        git_dir = os.path.join(repo_path, ".git")
+        if os.path.isfile(git_dir):
+            # Worktree or submodule, ".git" is a "gitdir: path" file.
+            with open(git_dir, "r") as handler:
+                content = handler.read().strip()
+            if not content.startswith("gitdir:"):
+                raise UnsupportedIndex("Unknown .git file: {}".format(git_dir))
+            git_dir = os.path.join(repo_path, content[len("gitdir:"):].strip())
+        self._index_file = os.path.join(git_dir, "index")
+
+        common_dir = git_dir
+        common_file = os.path.join(git_dir, "commondir")
+        if os.path.isfile(common_file):
+            with open(common_file, "r") as handler:
+                common_dir = os.path.join(git_dir, handler.read().strip())
+        with open(os.path.join(common_dir, "config"), "r") as handler:
+            config = handler.read().replace(" ", "").lower()
+        if "objectformat=sha256" in config:
+            self._hash_size = 32
+
+    def entries(self):
+        """
+        :return: List of (file name, blob id), sorted by file name.
+        :raise UnsupportedIndex: Split or sparse index, or unknown version.
+        """
+        with open(self._index_file, "rb") as handler:
+            with mmap.mmap(handler.fileno(), 0,
+                           access=mmap.ACCESS_READ) as data:
+                return self._parse(data)
+
+    def _parse(self, data):
+        signature, version, count = struct.unpack_from(">4sLL", data, 0)
+        if signature != b"DIRC" or version not in (2, 3, 4):
+            raise UnsupportedIndex("Index version {}".format(version))
+        hash_size = self._hash_size
+        # ctime, mtime, dev, ino, mode, uid, gid, size
+        stat_size = 40
+        offset = 12
+        name = b""
+        last_name = None
+        result = []
+        for _ in range(count):
+            entry_start = offset
+            mode = struct.unpack_from(">L", data, offset + 24)[0]
+            blob_id = data[offset + stat_size:offset + stat_size + hash_size]
+            offset += stat_size + hash_size
+            flags = struct.unpack_from(">H", data, offset)[0]
+            offset += 2
+            if version >= 3 and flags & 0x4000:
+                offset += 2
+            if version == 4:
+                strip, offset = _read_varint(data, offset)
+                end = data.find(b"\0", offset)
+                name = name[:len(name) - strip] + data[offset:end]
+                offset = end + 1
+            else:
+                end = data.find(b"\0", offset)
+                name = data[offset:end]
+                # Entries are padded with 1-8 NUL to a multiple of 8.
+                offset = entry_start + \
+                    ((end - entry_start) // 8 + 1) * 8
+            if mode & 0o170000 == 0o040000:
+                raise UnsupportedIndex("Sparse index")
+            if name == last_name:
+                # Unmerged entries have one record per stage.
+                continue
+            last_name = name
+            result.append((name.decode("utf-8"), blob_id.hex()))
+
+        # Extensions, the trailing checksum is not one of them.
+        while offset + 8 <= len(data) - hash_size:
+            signature, size = struct.unpack_from(">4sL", data, offset)
+            if signature in (b"link", b"sdir"):
+                raise UnsupportedIndex(
+                    "Index extension {}".format(signature.decode("ascii")))
+            offset += 8 + size
+        return result
+
+
+def _read_varint(data, offset):
+    """
+    Offset encoding of the index version 4 path prefix.
+    """
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, offset
@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from gitutil.commands import GitCommand
+
+
+class GitPool:
+    """
+    Run git queries of many repositories/branches on a thread pool.
+
+    ``GitCommand`` never changes the working directory of the process,
+    so one commander per working tree is shared by all the threads.
+    """
+    _git_path = "git"
+
+    def __init__(self, max_workers=4, git="git"):
+        """
+        :param max_workers: Max number of concurrent git processes.
+        :type max_workers: int
+        :param git: Executable git path.
+        """
+        self._git_path = git
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._commanders = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def get_commander(self, path):
+        """
+        :param path: Path of the working tree.
+        :rtype: GitCommand
+        """
+        with self._lock:
+            if path not in self._commanders:
+                self._commanders[path] = GitCommand(path, self._git_path)
+            return self._commanders[path]
+
+    def submit(self, path, method, *args):
+        """
+        Schedule ``GitCommand(path).method(*args)``.
+
+        :rtype: concurrent.futures.Future
+        """
+        return self._executor.submit(
+            getattr(self.get_commander(path), method), *args)
+
+    def map(self, queries):
+        """
+        Run a batch of queries concurrently.
+
+        :param queries: List of (path, method name, argument tuple).
+        :return: Results in the order of the queries.
+        :rtype: list
+        """
+        futures = [self.submit(path, method, *args)
+                   for path, method, args in queries]
+        return [future.result() for future in futures]
+
+    def close(self):
+        self._executor.shutdown()
+        with self._lock:
+            self._commanders = {}
@@ -0,0 +1,54 @@
+import asyncio
+
+from gitutil.commands import GitCommand
+
+
+async def refresh_repositories(path_list, parallel=4, timeout=300, git="git"):
+    """
+    Pull all the working trees concurrently.
+
+    :param path_list: Paths of the working trees.
+    :type path_list: list of str
+    :param parallel: Max number of concurrent pulls.
+    :type parallel: int
+    :param timeout: Seconds to wait for each pull.
+    :param git: Executable git path.
+    :return: Async generator of (path, succeeded, output) in the order
+    of completion.
+    """
+    semaphore = asyncio.Semaphore(parallel)
+
+    async def pull(path):
+        async with semaphore:
+            try:
+                output = await GitCommand(path, git).pull_async(timeout)
+            except asyncio.TimeoutError:
+                return path, False, "Timed out after {} seconds.".format(timeout)
+            except OSError as e:
+                return path, False, str(e)
+            if output is None:
+                return path, False, "git pull failed."
+            return path, True, output
+
+    for task in asyncio.as_completed([pull(path) for path in path_list]):
+        yield await task
+
+
+def iter_refresh_repositories(path_list, parallel=4, timeout=300, git="git"):
+    """
+    Synchronous version of ``refresh_repositories`` for the bot and cron.
+
+    :return: Generator of (path, succeeded, output) in the order
+    of completion.
+    """
+    loop = asyncio.new_event_loop()
+    progress = refresh_repositories(path_list, parallel, timeout, git)
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(progress.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(progress.aclose())
+        loop.close()
@@ -0,0 +1,104 @@
+import os
+
+from gitutil.commands import GitCommand
+
+
+class WorktreeManager:
+    """
+    Branch checkouts of a repository as worktrees of one shared bare
+    mirror, so objects are stored and fetched only once.
+
+    mirror:
+      url: "https://github.com/istio/istio.io.git"
+      path: "/errbot/repository/istio.io.git"
+    """
+    _mirror = None
+    _branches = None
+    _git_path = "git"
+
+    def __init__(self, mirror, branches, git="git"):
+        """
+        :param mirror: "mirror" item of the repository config.
+        :type mirror: dict
+        :param branches: "branches" items of the repository config.
+        :type branches: list of dict
+        :param git: Executable git path.
+        """
+        self._mirror = mirror
+        self._branches = branches
+        self._git_path = git
+
+    def _mirror_command(self):
+        return GitCommand(self._mirror["path"], self._git_path)
+
+    def setup(self):
+        """
+        Clone the mirror if needed and create missing worktrees.
+
+        :return: Generator of messages.
+        """
+        mirror_path = self._mirror["path"]
+        if not os.path.exists(mirror_path):
+            parent = os.path.dirname(os.path.abspath(mirror_path))
+            os.makedirs(parent, exist_ok=True)
+            if GitCommand(parent, self._git_path).clone(
+                    self._mirror["url"], mirror_path, bare=True) is None:
+                yield "Failed to clone {}.".format(self._mirror["url"])
+                return
+            mirror = self._mirror_command()
+            # A bare clone maps branches to refs/heads, which can't be
+            # fetched into while they are checked out in worktrees.
+            mirror.set_config("remote.origin.fetch",
+                              "+refs/heads/*:refs/remotes/origin/*")
+            mirror.fetch()
+            yield "{} had been cloned.".format(mirror_path)
+        mirror = self._mirror_command()
+
+        worktrees = [os.path.realpath(path)
+                     for path in mirror.list_worktrees()]
+        for branch in self._branches:
+            path = branch["path"]
+            if os.path.realpath(path) in worktrees:
+                continue
+            if os.path.exists(path):
+                yield "{} exists and is not a worktree, skipped.".format(path)
+                continue
+            target = branch["target_branch"]
+            if mirror.add_worktree(path, target,
+                                   "origin/" + target) is None:
+                yield "Failed to create worktree {}.".format(path)
+            else:
+                yield "{} had been created.".format(path)
+
+    def refresh(self):
+        """
+        Fetch the mirror once and fast-forward every worktree. Paths which
+        are standalone clones, e.g. of a deployment older than the mirror,
+        are pulled by themselves, the mirror's fetch doesn't update them.
+
+        :return: Generator of (path, succeeded, output).
+        """
+        mirror = self._mirror_command()
+        if mirror.fetch() is None:
+            for branch in self._branches:
+                yield branch["path"], False, "git fetch failed."
+            return
+        worktrees = [os.path.realpath(path)
+                     for path in mirror.list_worktrees()]
+        for branch in self._branches:
+            path = branch["path"]
+            if not os.path.isdir(path):
+                yield path, False, "Worktree is missing."
+                continue
+            commander = GitCommand(path, self._git_path)
+            if os.path.realpath(path) in worktrees:
+                output = commander.merge_ff_only(
+                    "origin/" + branch["target_branch"])
+                failure = "git merge --ff-only failed."
+            else:
+                output = commander.pull_ff_only()
+                failure = "Not a worktree of the mirror, git pull failed."
+            if output is None:
+                yield path, False, failure
+            else:
+                yield path, True, output.strip()
@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from gitutil.commands import GitCommand
+
+GIT = ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+
+
+def _random_page(generator, lines):
+    words = ["alpha", "beta", "gamma", "delta", "istio", "mesh", "proxy",
+             "", "---", "```"]
+    return ["{} {}\n".format(generator.choice(words), generator.choice(words))
+            for _ in range(lines)]
+
+
+def _edit(generator, page):
+    page = list(page)
+    for _ in range(generator.randint(1, 12)):
+        action = generator.randint(0, 2)
+        index = generator.randint(0, max(len(page) - 1, 0))
+        if action == 0 and len(page) > 0:
+            del page[index]
+        elif action == 1:
+            page[index:index] = _random_page(generator, generator.randint(1, 5))
+        elif len(page) > 0:
+            page[index] = "changed {}\n".format(generator.random())
+    return page
+
+
+class TestIterDiffs(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        subprocess.check_call(["git", "init", "-q", self.path])
+        self.commits = []
+        generator = random.Random(42)
+        self.files = ["content/page{}.md".format(i) for i in range(36)]
+        self.files += ["content/with space.md", "content/中文.md",
+                       "content/new.md"]
+        pages = {name: _random_page(generator, 40) for name in self.files}
+        for commit in range(3):
+            for name, page in pages.items():
+                if name == "content/new.md" and commit == 0:
+                    continue
+                if commit > 0:
+                    pages[name] = page = _edit(generator, page)
+                file_name = os.path.join(self.path, name)
+                os.makedirs(os.path.dirname(file_name), exist_ok=True)
+                with open(file_name, "w") as handler:
+                    handler.writelines(page)
+            subprocess.check_call(["git", "add", "-A"], cwd=self.path)
+            subprocess.check_call(GIT + ["commit", "-q", "-m", str(commit)],
+                                  cwd=self.path)
+            self.commits.append(subprocess.check_output(
+                ["git", "rev-parse", "HEAD"], cwd=self.path).decode().strip())
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_same_as_git_diff(self):
+        commander = GitCommand(self.path)
+        triples = []
+        for index, name in enumerate(self.files):
+            new, old = self.commits[2], self.commits[index % 2]
+            triples.append((name, new, old))
+        diffs = commander.get_diffs_by_hash(triples)
+        self.assertEqual(len(diffs), len(self.files))
+        for name, new, old in triples:
+            self.assertEqual(diffs[name],
+                             commander.get_diff_by_hash(name, new, old))
+            self.assertNotEqual(diffs[name], "")
+
+    def test_unchanged_and_truncated(self):
+        commander = GitCommand(self.path)
+        name = self.files[0]
+        head = self.commits[2]
+        self.assertEqual(commander.get_diffs_by_hash([(name, head, head)]),
+                         {name: ""})
+        full = commander.get_diff_by_hash(name, head, self.commits[0])
+        diff = commander.get_diffs_by_hash(
+            [(name, head, self.commits[0])], 200)[name]
+        self.assertTrue(diff.endswith("(diff truncated at 200 characters)"))
+        self.assertTrue(full.startswith(diff.rsplit("\n", 1)[0].strip()))
+
+    def test_no_base_commit(self):
+        commander = GitCommand(self.path)
+        name = self.files[0]
+        head = self.commits[2]
+        diff = commander.get_diffs_by_hash([(name, head, None)])[name]
+        self.assertEqual(diff, commander.get_diff_by_hash(name, head, None))
+        self.assertIn("deleted file mode", diff)
+        with open(os.path.join(self.path, name)) as handler:
+            lines = handler.read().splitlines()
+        self.assertEqual(
+            [line[1:] for line in diff.split("\n")[6:]], lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
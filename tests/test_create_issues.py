@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from transutil.issuestore import IssueIndex
+from transutil.transutil import TranslateUtil
+
+
+class FakeIssue:
+    def __init__(self, number, labels):
+        self.number = number
+        self.labels = labels
+
+
+class FakeRepo:
+    def __init__(self):
+        self.created = []
+
+    def create_issue(self, title, body, labels=None):
+        self.created.append(title)
+        return FakeIssue(len(self.created), labels)
+
+
+class FakeOperator:
+    def __init__(self):
+        self.repo = FakeRepo()
+
+    def get_repo(self, repo_name):
+        return self.repo
+
+    def check_limit(self, *args):
+        pass
+
+    def write(self, method, *args, **kwargs):
+        return method(*args, **kwargs)
+
+
+def _item(title):
+    return {"title": title, "body": "", "labels": ["sync/new"]}
+
+
+class TestCreateIssues(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        config_file = os.path.join(self.path, "repository.yaml")
+        with open(config_file, "w") as handler:
+            handler.write("repositories: {}\n")
+        self.trans = TranslateUtil(config_file, "test-token")
+        self.operator = FakeOperator()
+        self.trans._get_github_operator = lambda: self.operator
+        self.journal_file = os.path.join(self.path, "journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_duplicates_are_reported(self):
+        index = IssueIndex()
+        index.add(9, "/old.md", ["sync/new"])
+        result = list(self.trans.create_issues(
+            "o/t", self.journal_file,
+            [_item("/a.md"), _item("/b.md"), _item("/old.md"),
+             _item("/b.md")], dedupe_index=index, max_write=1))
+        self.assertEqual(result, [
+            ("/old.md", "skipped", 9), ("/b.md", "skipped", None),
+            ("/a.md", "created", 1), ("/a.md", "labeled", 1)])
+
+        # /b.md is still planned, /a.md is labeled but kept in the journal
+        # until every issue is done.
+        result = list(self.trans.create_issues(
+            "o/t", self.journal_file, [_item("/a.md"), _item("/c.md")],
+            dedupe_index=index))
+        self.assertEqual(result, [
+            ("/a.md", "skipped", 1),
+            ("/b.md", "created", 2), ("/b.md", "labeled", 2),
+            ("/c.md", "created", 3), ("/c.md", "labeled", 3)])
+        self.assertEqual(self.operator.repo.created,
+                         ["/a.md", "/b.md", "/c.md"])
+        self.assertFalse(os.path.exists(self.journal_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
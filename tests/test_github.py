@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+
+import unittest
+
+from githubutil.github import GithubAction
+
+LABELS = [
+    {"group": "status", "labels": ["pending", "translating", "pushed"]},
+]
+
+
+class FakeLabel:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeIssue:
+    def __init__(self, labels):
+        self.labels = [FakeLabel(name) for name in labels]
+        self.set_calls = []
+
+    def set_labels(self, *labels):
+        self.set_calls.append(list(labels))
+        self.labels = [FakeLabel(name) for name in labels]
+
+
+class TestSetLabel(unittest.TestCase):
+    def _set_label(self, labels, group, label, mutex):
+        action = GithubAction("test-token")
+        action.label_list = LABELS
+        action.write_interval = 0
+        issue = FakeIssue(labels)
+        action.get_issue = lambda repo, number: issue
+        action._set_label({"repo": "o/r", "issue_id": 1}, group, label,
+                          mutex)
+        return issue
+
+    def test_mutex(self):
+        issue = self._set_label(["kind/docs", "pending"], "status",
+                                "translating", True)
+        self.assertEqual(issue.set_calls, [["kind/docs", "translating"]])
+
+    def test_not_mutex(self):
+        issue = self._set_label(["kind/docs", "pending"], "status",
+                                "translating", False)
+        self.assertEqual(issue.set_calls,
+                         [["kind/docs", "pending", "translating"]])
+
+    def test_unchanged(self):
+        issue = self._set_label(["translating"], "status", "translating",
+                                True)
+        self.assertEqual(issue.set_calls, [])
+
+    def test_label_not_in_group(self):
+        issue = self._set_label(["kind/docs", "pending"], "status",
+                                "unknown", False)
+        self.assertEqual(issue.set_calls, [])
+        # A mutex removes the labels of the group even if the label
+        # isn't in it.
+        issue = self._set_label(["kind/docs", "pending"], "status",
+                                "unknown", True)
+        self.assertEqual(issue.set_calls, [["kind/docs"]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+# -*- coding: UTF-8 -*-
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+from email.utils import formatdate
+
+from githubutil import ratelimit
+from githubutil.github import GithubOperator
+from transutil.transutil import SYNC_OVERLAP, TranslateUtil
+
+TOKEN = "issue-cache-test-token"
+# Clock of the fake Github server, behind the local one.
+SKEW = -3600
+
+
+class FakeIssue:
+    pull_request = None
+    state = "open"
+    labels = []
+
+    def __init__(self, number, updated_at):
+        self.number = number
+        self.title = "issue {}".format(number)
+        self.updated_at = updated_at
+
+
+class FakeReader(GithubOperator):
+    def __init__(self):
+        GithubOperator.__init__(self, TOKEN)
+        self.since_list = []
+        self.issue = FakeIssue(
+            1, datetime.utcnow() + timedelta(seconds=SKEW - 60))
+
+    def check_limit(self, *args):
+        pass
+
+    def list_issues(self, repository_name, state="open", since=None,
+                    labels=None):
+        self.since_list.append(since)
+        # The response tells the server time.
+        ratelimit.get_scheduler(TOKEN).update(
+            "core", 200, {"date": formatdate(time.time() + SKEW,
+                                             usegmt=True)})
+        return [self.issue]
+
+
+class TestRefreshIssueCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.path, "repository.yaml")
+        with open(self.config_file, "w") as handler:
+            handler.write("repositories: {}\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_synced_at_is_server_time(self):
+        trans = TranslateUtil(self.config_file, TOKEN)
+        reader = FakeReader()
+        trans._get_github_reader = lambda resource="core": reader
+        file_name = os.path.join(self.path, "issues.db")
+        started_at = datetime.utcnow()
+        self.assertEqual(trans.refresh_issue_cache("o/t", file_name), (1, 0))
+        trans.refresh_issue_cache("o/t", file_name)
+        self.assertIsNone(reader.since_list[0])
+        since = reader.since_list[1]
+        expected = started_at + timedelta(seconds=SKEW) - SYNC_OVERLAP
+        self.assertLess(abs((since - expected).total_seconds()), 10)
+        # An update seen shortly before the sync is listed again.
+        self.assertLessEqual(since, reader.issue.updated_at)
+
+
+if __name__ == "__main__":
+    unittest.main()
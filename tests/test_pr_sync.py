@@ -0,0 +1,162 @@
+# -*- coding: UTF-8 -*-
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+import github
+
+from githubutil import transport
+from transutil.transutil import TranslateUtil
+
+CONFIG = """
+repositories:
+  istio:
+    github:
+      task: {owner: o, repository: t}
+      code: {owner: o, repository: c}
+    valid_extensions: [".md"]
+    labels: [priority/P0]
+    branches:
+    - name: "1.1"
+      target_branch: master
+      path: "%s"
+      url_prefix: {source: "https://x/content"}
+      labels: [version/1.1]
+    source: {name: en, path: content}
+    languages:
+    - name: zh
+      path: content_zh
+      labels: [lang/zh]
+      target_labels: [translation/chinese]
+    status: {pushed: pushed, merged: merged, pending: pending, working: translating}
+"""
+
+TOKEN = "sync-test-token"
+
+
+def _pr_node(number):
+    return {
+        "number": number,
+        "url": "https://x/pr/{}".format(number),
+        "merged": False,
+        "baseRefName": "master",
+        "headRefName": "h{}".format(number),
+        "author": {"login": "alice"},
+        "files": {"pageInfo": {"hasNextPage": False, "endCursor": None},
+                  "nodes": [{"path": "content_zh/docs/{}.md".format(number)}]},
+        "comments": {"pageInfo": {"hasNextPage": False, "endCursor": None},
+                     "nodes": []},
+    }
+
+
+def _issue_node(number, title, labels):
+    return {
+        "number": number,
+        "title": title,
+        "url": "https://x/issues/{}".format(number),
+        "assignees": {"nodes": [{"login": "alice"}]},
+        "labels": {"nodes": [{"name": name} for name in labels]},
+    }
+
+
+class FakeGithub(BaseHTTPRequestHandler):
+    """
+    GraphQL and REST API of Github, records the requests.
+    """
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"null")
+        path = self.path.split("?")[0]
+        FakeGithub.requests.append((self.command, path))
+        if path == "/graphql":
+            variables = body["variables"]
+            if "query" in variables:
+                result = {"data": {"search": {
+                    "pageInfo": {"hasNextPage": False, "endCursor": None},
+                    "nodes": [_pr_node(number) for number in (1, 2, 3)]}}}
+            else:
+                data = {}
+                for index, key in enumerate(sorted(variables.keys())):
+                    title = variables[key].split()[-1]
+                    labels = ["translating"] if index > 0 else []
+                    data[key.replace("q", "s")] = {"nodes": [
+                        _issue_node(10 + index, title, labels)]}
+                result = {"data": data}
+        elif path.endswith("/comments"):
+            result = {"id": 1, "body": body["body"]}
+        elif path.endswith("/labels"):
+            names = body["labels"] if isinstance(body, dict) else body
+            result = [{"name": name} for name in names]
+        else:
+            result = {}
+        data = json.dumps(result).encode("utf-8")
+        self.send_response(201 if self.command == "POST" and
+                           path != "/graphql" else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = _reply
+
+
+class TestSyncPrState(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.path, "repository.yaml")
+        with open(self.config_file, "w") as handler:
+            handler.write(CONFIG % self.path)
+        self.server = HTTPServer(("127.0.0.1", 0), FakeGithub)
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        base_url = "http://127.0.0.1:{}".format(self.server.server_port)
+        self.endpoint = base_url + "/graphql"
+        for lazy in (False, True):
+            transport._clients[(TOKEN, lazy)] = github.Github(
+                auth=github.Auth.Token(TOKEN), base_url=base_url, lazy=lazy,
+                seconds_between_requests=0, seconds_between_writes=0)
+        FakeGithub.requests = []
+
+    def tearDown(self):
+        for lazy in (False, True):
+            transport._clients.pop((TOKEN, lazy), None)
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.path)
+
+    def test_requests(self):
+        trans = TranslateUtil(self.config_file, TOKEN,
+                              graphql_endpoint=self.endpoint)
+        with mock.patch("transutil.transutil.time.sleep"):
+            result = trans.sync_pr_state_to_task_issue("istio", "1.1", "zh")
+        self.assertEqual(result, ["https://x/pr/1", "https://x/pr/2",
+                                  "https://x/pr/3"])
+        requests = FakeGithub.requests
+        # The PRs in one query, their task issues in one aliased query.
+        self.assertEqual(requests.count(("POST", "/graphql")), 2)
+        # Task issues and PRs are written without being fetched.
+        self.assertEqual([item for item in requests if item[0] == "GET"], [])
+        self.assertEqual(requests.count(("PUT", "/repos/o/t/issues/10/labels")),
+                         1)
+        for number in (10, 11, 12):
+            self.assertIn(("POST", "/repos/o/t/issues/{}/comments".format(
+                number)), requests)
+        for number in (1, 2, 3):
+            self.assertIn(("POST", "/repos/o/c/issues/{}/comments".format(
+                number)), requests)
+        self.assertEqual(len(requests), 2 + 1 + 3 + 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+# -*- coding: UTF-8 -*-
+
+import asyncio
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from gitutil.refresh import iter_refresh_repositories, refresh_repositories
+from gitutil.worktree import WorktreeManager
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "test",
+    "GIT_AUTHOR_EMAIL": "test@example.com",
+    "GIT_COMMITTER_NAME": "test",
+    "GIT_COMMITTER_EMAIL": "test@example.com",
+    "GIT_CONFIG_COUNT": "1",
+    "GIT_CONFIG_KEY_0": "init.defaultBranch",
+    "GIT_CONFIG_VALUE_0": "master",
+}
+
+
+def _git(path, *args):
+    return subprocess.check_output(
+        ["git"] + list(args), cwd=path,
+        stderr=subprocess.DEVNULL).decode("utf-8").strip()
+
+
+class GitTestCase(unittest.TestCase):
+    """
+    A bare origin with one commit on master, pushed from a seed clone.
+    """
+    def setUp(self):
+        self.env = mock.patch.dict(os.environ, GIT_ENV)
+        self.env.start()
+        self.path = tempfile.mkdtemp()
+        self.origin = os.path.join(self.path, "origin.git")
+        self.seed = os.path.join(self.path, "seed")
+        _git(self.path, "init", "-q", "--bare", self.origin)
+        _git(self.path, "clone", "-q", self.origin, self.seed)
+        self.push("first")
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+        self.env.stop()
+
+    def push(self, content):
+        """
+        :return: The pushed commit.
+        """
+        with open(os.path.join(self.seed, "page.md"), "w") as handler:
+            handler.write(content + "\n")
+        _git(self.seed, "add", "-A")
+        _git(self.seed, "commit", "-q", "-m", content)
+        _git(self.seed, "push", "-q", "origin", "HEAD:master")
+        return _git(self.seed, "rev-parse", "HEAD")
+
+    def clone(self, name):
+        path = os.path.join(self.path, name)
+        _git(self.path, "clone", "-q", self.origin, path)
+        return path
+
+
+class TestRefreshRepositories(GitTestCase):
+    def test_success_and_failure(self):
+        clones = [self.clone("a"), self.clone("b")]
+        broken = os.path.join(self.path, "broken")
+        os.makedirs(broken)
+        head = self.push("second")
+        result = {path: (succeeded, output) for path, succeeded, output in
+                  iter_refresh_repositories(clones + [broken], parallel=2)}
+        self.assertEqual(set(result.keys()), set(clones + [broken]))
+        for path in clones:
+            self.assertTrue(result[path][0])
+            self.assertEqual(_git(path, "rev-parse", "HEAD"), head)
+        self.assertEqual(result[broken], (False, "git pull failed."))
+
+    def test_missing_path(self):
+        missing = os.path.join(self.path, "missing")
+        result = list(iter_refresh_repositories([missing]))
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0][:2], (missing, False))
+
+    def test_timeout(self):
+        # A git which never answers.
+        git = os.path.join(self.path, "slow-git")
+        with open(git, "w") as handler:
+            handler.write("#!/bin/sh\nexec sleep 30\n")
+        os.chmod(git, os.stat(git).st_mode | stat.S_IEXEC)
+        clone = self.clone("a")
+
+        async def collect():
+            return [item async for item in refresh_repositories(
+                [clone], timeout=0.5, git=git)]
+
+        self.assertEqual(asyncio.run(collect()),
+                         [(clone, False, "Timed out after 0.5 seconds.")])
+
+
+class TestWorktreeManager(GitTestCase):
+    def setUp(self):
+        GitTestCase.setUp(self)
+        self.mirror = {"url": self.origin,
+                       "path": os.path.join(self.path, "mirror.git")}
+
+    def _branch(self, name):
+        return {"path": os.path.join(self.path, name),
+                "target_branch": "master"}
+
+    def test_setup_and_refresh(self):
+        branches = [self._branch("worktree")]
+        manager = WorktreeManager(self.mirror, branches)
+        self.assertEqual(list(manager.setup()), [
+            "{} had been cloned.".format(self.mirror["path"]),
+            "{} had been created.".format(branches[0]["path"])])
+        # Nothing is left to do.
+        self.assertEqual(list(manager.setup()), [])
+
+        head = self.push("second")
+        result = list(manager.refresh())
+        self.assertEqual([item[:2] for item in result],
+                         [(branches[0]["path"], True)])
+        self.assertEqual(_git(branches[0]["path"], "rev-parse", "HEAD"),
+                         head)
+
+    def test_standalone_clone(self):
+        standalone = self.clone("standalone")
+        diverged = self.clone("diverged")
+        with open(os.path.join(diverged, "local.md"), "w") as handler:
+            handler.write("local\n")
+        _git(diverged, "add", "-A")
+        _git(diverged, "commit", "-q", "-m", "local")
+        branches = [{"path": standalone, "target_branch": "master"},
+                    {"path": diverged, "target_branch": "master"},
+                    self._branch("missing")]
+        manager = WorktreeManager(self.mirror, branches[:2])
+        self.assertEqual(list(manager.setup())[1:], [
+            "{} exists and is not a worktree, skipped.".format(standalone),
+            "{} exists and is not a worktree, skipped.".format(diverged)])
+
+        head = self.push("second")
+        result = list(WorktreeManager(self.mirror, branches).refresh())
+        self.assertEqual(result[0][:2], (standalone, True))
+        self.assertEqual(_git(standalone, "rev-parse", "HEAD"), head)
+        # The fallback pulls with --ff-only, a diverged clone fails.
+        self.assertEqual(result[1], (
+            diverged, False,
+            "Not a worktree of the mirror, git pull failed."))
+        self.assertEqual(result[2], (branches[2]["path"], False,
+                                     "Worktree is missing."))
+
+    def test_fetch_failure(self):
+        branches = [self._branch("worktree")]
+        manager = WorktreeManager(self.mirror, branches)
+        list(manager.setup())
+        shutil.rmtree(self.origin)
+        self.assertEqual(list(manager.refresh()),
+                         [(branches[0]["path"], False, "git fetch failed.")])
+
+
+if __name__ == "__main__":
+    unittest.main()
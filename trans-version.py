@@ -2,7 +2,11 @@
 from transutil.transutil import TranslateUtil
 
 util = TranslateUtil("/Users/dustise/Downloads/k8s-repo.yaml",
-                     "")
-
-util.copy_version("kubernetes", "1.12", "1.14", "zh")
+                     "", read_index=True)
 
+# dry_run=True lists the files without copying them.
+manifest = util.copy_version("kubernetes", "1.12", "1.14", "zh",
+                             dry_run=False, link_mode="reflink", workers=8)
+for source_file, target_file in manifest:
+    print("{} -> {}".format(source_file, target_file))
+print("{} files copied.".format(len(manifest)))
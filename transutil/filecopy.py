@@ -0,0 +1,77 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from shutil import copyfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# _IOW(0x94, 9, int) in linux/fs.h
+FICLONE = 0x40049409
+LINK_MODES = ("copy", "hardlink", "reflink")
+
+
+def reflink(source, target):
+    """
+    Share the data blocks of the source with the target, supported by
+    Btrfs, XFS and other copy-on-write filesystems.
+    """
+    if fcntl is None:
+        raise OSError("FICLONE is not supported on this platform")
+    with open(source, "rb") as source_file:
+        with open(target, "wb") as target_file:
+            fcntl.ioctl(target_file.fileno(), FICLONE, source_file.fileno())
+
+
+def copy_file(source, target, mode="copy"):
+    """
+    Copy a file, the target is replaced and its directory created.
+    Links fall back to a plain copy when the filesystem can't make them.
+
+    The new file is written aside and renamed over the target, so a
+    target hard linked to another file never changes that file.
+
+    :param mode: One of ``LINK_MODES``.
+    :type mode: str
+    """
+    if mode not in LINK_MODES:
+        raise ValueError("Unknown link mode: {}".format(mode))
+    if mode == "hardlink" and os.path.exists(target) and \
+            os.path.samefile(source, target):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_name = "{}.{}.{}.tmp".format(target, os.getpid(),
+                                     threading.get_ident())
+    try:
+        try:
+            if mode == "hardlink":
+                os.link(source, tmp_name)
+            elif mode == "reflink":
+                reflink(source, tmp_name)
+            else:
+                copyfile(source, tmp_name)
+        except OSError as e:
+            if mode == "copy":
+                raise
+            logging.info("Can't {} {}, copy it: {}".format(mode, source, e))
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            copyfile(source, tmp_name)
+        os.replace(tmp_name, target)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def copy_files(manifest, mode="copy", workers=4):
+    """
+    :param manifest: List of (source file, target file).
+    :param workers: Number of files copied concurrently.
+    """
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(lambda item: copy_file(item[0], item[1], mode),
+                      manifest))
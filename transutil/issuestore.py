@@ -0,0 +1,196 @@
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    number INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    updated_at TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS labels (
+    number INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (number, name)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS issues_title ON issues (title);
+CREATE INDEX IF NOT EXISTS labels_name ON labels (name, number);
+"""
+
+
+class IssueStore:
+    """
+    Open issues cached in a SQLite file, looked up by title and labels.
+
+    Records are dicts like
+    ``{"number": 1234, "title": "Issue Title", "labels": ["version/1.12"],
+    "updated_at": "2019-02-13T08:00:00Z"}``.
+    """
+    _file_name = ""
+    _connection = None
+    _lock = None
+
+    def __init__(self, file_name):
+        """
+        :param file_name: SQLite database file, created if it's missing.
+        :type file_name: str
+        """
+        self._file_name = file_name
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file_name,
+                                           check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def _write(self, record):
+        number = record["number"]
+        self._connection.execute(
+            "INSERT OR REPLACE INTO issues (number, title, updated_at) "
+            "VALUES (?, ?, ?)",
+            (number, record["title"], record.get("updated_at", "")))
+        self._connection.execute("DELETE FROM labels WHERE number = ?",
+                                 (number,))
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO labels (number, name) VALUES (?, ?)",
+            [(number, name) for name in record["labels"]])
+
+    def replace_all(self, records):
+        """
+        Drop the cached issues and save the records in one transaction.
+
+        :type records: list of dict
+        """
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM issues")
+            self._connection.execute("DELETE FROM labels")
+            for record in records:
+                self._write(record)
+
+    def upsert(self, records):
+        """
+        Save the records, an issue is only replaced by a record updated
+        at the same time or later.
+
+        :type records: list of dict
+        :return: Count of the issues written.
+        :rtype: int
+        """
+        count = 0
+        with self._lock, self._connection:
+            for record in records:
+                row = self._connection.execute(
+                    "SELECT updated_at FROM issues WHERE number = ?",
+                    (record["number"],)).fetchone()
+                if row is not None and \
+                        row[0] > record.get("updated_at", ""):
+                    continue
+                self._write(record)
+                count += 1
+        return count
+
+    def delete(self, numbers):
+        """
+        :type numbers: list of int
+        """
+        numbers = [(number,) for number in numbers]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "DELETE FROM issues WHERE number = ?", numbers)
+            self._connection.executemany(
+                "DELETE FROM labels WHERE number = ?", numbers)
+
+    def find(self, title, labels=None):
+        """
+        Issues with the title and all of the labels.
+
+        :type title: str
+        :type labels: list of str
+        :return: Issue numbers.
+        :rtype: list of int
+        """
+        labels = sorted(set(labels or []))
+        query = "SELECT number FROM issues WHERE title = ?"
+        args = [title]
+        if len(labels) > 0:
+            query += " AND (SELECT COUNT(*) FROM labels " \
+                     "WHERE labels.number = issues.number " \
+                     "AND name IN ({})) = ?".format(
+                         ", ".join(["?"] * len(labels)))
+            args += labels + [len(labels)]
+        with self._lock:
+            rows = self._connection.execute(query, args).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self):
+        """
+        :rtype: int
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM issues").fetchone()[0]
+
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (key, value))
+
+
+class IssueIndex:
+    """
+    Open issues in memory, title to labels, for checking many new issues
+    against one listing.
+    """
+    _issues = None
+
+    def __init__(self, records=None):
+        """
+        :param records: Issue records, same as the ``IssueStore`` ones.
+        :type records: list of dict
+        """
+        self._issues = {}
+        for record in records or []:
+            self.add(record["number"], record["title"], record["labels"])
+
+    def __len__(self):
+        return sum([len(item) for item in self._issues.values()])
+
+    def add(self, number, title, labels):
+        """
+        :type number: int
+        :type title: str
+        :type labels: list of str
+        """
+        self._issues.setdefault(title, []).append((number,
+                                                   frozenset(labels)))
+
+    def find(self, title, labels=None):
+        """
+        Issues with the title and all of the labels.
+
+        :type title: str
+        :type labels: list of str
+        :return: Issue numbers.
+        :rtype: list of int
+        """
+        labels = set(labels or [])
+        return [number for number, issue_labels in self._issues.get(title, [])
+                if labels.issubset(issue_labels)]
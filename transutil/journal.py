@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+PLANNED = "planned"
+CREATED = "created"
+LABELED = "labeled"
+
+
+class IssueJournal:
+    """
+    Write-ahead journal of bulk issue creation, one JSON record per line.
+
+    Each issue goes planned -> created -> labeled, a record is written
+    and flushed before the next step starts, so an interrupted run can
+    be resumed without creating an issue twice.
+    """
+    _file_name = ""
+    _entries = None
+    _lock = None
+
+    def __init__(self, file_name):
+        """
+        :param file_name: Journal file, created if it's missing.
+        :type file_name: str
+        """
+        self._file_name = file_name
+        self._entries = {}
+        self._lock = threading.Lock()
+        if not os.path.exists(file_name):
+            return
+        with open(file_name, "r") as handler:
+            for line in handler:
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write of the last record.
+                    continue
+                entry = self._entries.setdefault(record["title"], {})
+                entry.update(record)
+
+    def _append(self, records):
+        dir_name = os.path.dirname(self._file_name)
+        if len(dir_name) > 0:
+            os.makedirs(dir_name, exist_ok=True)
+        with open(self._file_name, "a") as handler:
+            for record in records:
+                handler.write(json.dumps(record) + "\n")
+            handler.flush()
+            os.fsync(handler.fileno())
+        for record in records:
+            self._entries.setdefault(record["title"], {}).update(record)
+
+    def get(self, title):
+        """
+        :return: Latest state of the issue, None if it's not journaled.
+        :rtype: dict
+        """
+        return self._entries.get(title)
+
+    def plan(self, items):
+        """
+        Journal issues to create, titles already in the journal are
+        ignored.
+
+        :param items: List of dicts with "title", "body" and "labels".
+        :return: Count of the planned issues.
+        :rtype: int
+        """
+        with self._lock:
+            records = []
+            for item in items:
+                if item["title"] in self._entries:
+                    continue
+                record = dict(item)
+                record["state"] = PLANNED
+                records.append(record)
+            self._append(records)
+        return len(records)
+
+    def mark(self, title, state, number=None):
+        """
+        :param state: CREATED or LABELED.
+        :param number: Number of the created issue.
+        """
+        record = {"title": title, "state": state}
+        if number is not None:
+            record["number"] = number
+        with self._lock:
+            self._append([record])
+
+    def pending(self):
+        """
+        :return: Issues not labeled yet, in the planned order.
+        :rtype: list of dict
+        """
+        with self._lock:
+            return [dict(entry) for entry in self._entries.values()
+                    if entry["state"] != LABELED]
+
+    def clear(self):
+        """
+        Forget all the issues, e.g. when all of them are done.
+        """
+        with self._lock:
+            self._entries = {}
+            if os.path.exists(self._file_name):
+                os.remove(self._file_name)
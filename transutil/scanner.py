@@ -0,0 +1,116 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from gitutil.configure import Configuration
+from transutil.transutil import TranslateUtil
+
+
+def _get_context():
+    """
+    Workers are started by a fork server, or spawned where there's none.
+    Forking the caller, e.g. the multi-threaded bot, could copy locks
+    held by its other threads into the workers.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _scan_branch(config_file, options, repository, branch, languages):
+    """
+    Scan all the languages of a branch in a worker process, the listing
+    and the history index of the branch are shared by the languages.
+    """
+    trans = TranslateUtil(config_file, "", **options)
+    result = {}
+    try:
+        for language in languages:
+            result[language] = {
+                "new": trans.find_new_files(repository, branch, language),
+                "updated": trans.find_updated_files(repository, branch,
+                                                    language)
+            }
+    finally:
+        trans.close()
+    return result
+
+
+class ScanEngine:
+    """
+    Run find_new_files and find_updated_files for many repositories,
+    branches and languages on a process pool.
+    """
+    _config_file = ""
+    _max_workers = None
+    _options = None
+
+    def __init__(self, config_file, max_workers=None, **options):
+        """
+        :param config_file: Name of the repository config file.
+        :param max_workers: Number of worker processes, defaults to the
+        number of CPUs.
+        :param options: Other arguments of TranslateUtil, e.g. git_path,
+        state_path or read_index.
+        """
+        self._config_file = config_file
+        self._max_workers = max_workers
+        self._options = options
+
+    def _list_targets(self, repositories=None, branches=None,
+                      languages=None):
+        """
+        :return: List of (repository, branch, list of languages).
+        """
+        config = Configuration.load(self._config_file)
+        result = []
+        for repository in config.list_repository():
+            if repositories is not None and repository not in repositories:
+                continue
+            language_list = [item["name"]
+                             for item in config.list_languages(repository)
+                             if languages is None or item["name"] in languages]
+            for branch in config.list_branch(repository):
+                if branches is not None and branch not in branches:
+                    continue
+                result.append((repository, branch, language_list))
+        return result
+
+    def iter_scan(self, repositories=None, branches=None, languages=None):
+        """
+        Scan the branches concurrently, None means all in the config.
+
+        :type repositories: list of str
+        :type branches: list of str
+        :type languages: list of str
+        :return: Generator of (repository, branch, result, error) in the
+        order of completion, result is keyed by language.
+        """
+        targets = self._list_targets(repositories, branches, languages)
+        with ProcessPoolExecutor(self._max_workers,
+                                 mp_context=_get_context()) as pool:
+            futures = {}
+            for repository, branch, language_list in targets:
+                future = pool.submit(_scan_branch, self._config_file,
+                                     self._options, repository, branch,
+                                     language_list)
+                futures[future] = (repository, branch)
+            for future in as_completed(futures):
+                repository, branch = futures[future]
+                try:
+                    yield repository, branch, future.result(), None
+                except Exception as e:
+                    yield repository, branch, None, str(e)
+
+    def scan(self, repositories=None, branches=None, languages=None):
+        """
+        :return: {repository: {branch: {language: {"new": list,
+        "updated": dict}}}}, a failed branch is {"error": message}.
+        :rtype: dict
+        """
+        result = {}
+        for repository, branch, branch_result, error in self.iter_scan(
+                repositories, branches, languages):
+            if error is not None:
+                branch_result = {"error": error}
+            result.setdefault(repository, {})[branch] = branch_result
+        return result
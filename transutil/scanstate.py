@@ -0,0 +1,41 @@
+import json
+import os
+
+
+class ScanState:
+    """
+    Result of a translation scan, persisted with the HEAD it was computed at.
+
+    record = {
+        "head": "0c89f960dadf07abc4f5c07653f2376e0f8ae17b",
+        "result": ["/file/name.md"]
+    }
+    """
+    _file_name = ""
+    head = None
+    result = None
+
+    def __init__(self, state_path, repository, branch, language, kind):
+        """
+        :param state_path: Directory of the state files.
+        :type state_path: str
+        :param kind: Kind of the scan, "new" or "updated".
+        :type kind: str
+        """
+        self._file_name = os.path.join(
+            state_path,
+            "{}-{}-{}-{}.json".format(repository, branch, language, kind))
+        if os.path.exists(self._file_name):
+            with open(self._file_name, "r") as handler:
+                obj = json.load(handler)
+            self.head = obj["head"]
+            self.result = obj["result"]
+
+    def save(self, head, result):
+        self.head = head
+        self.result = result
+        os.makedirs(os.path.dirname(self._file_name), exist_ok=True)
+        tmp_name = self._file_name + ".tmp"
+        with open(tmp_name, "w") as handler:
+            json.dump({"head": head, "result": result}, handler)
+        os.replace(tmp_name, self._file_name)
@@ -2,31 +2,77 @@ import time
 
 from gitutil.commands import GitCommand
 from gitutil.configure import Configuration
+from gitutil.history import HistoryIndex
+from gitutil.pool import GitPool
+from transutil.filecopy import copy_files
+from transutil.issuestore import IssueIndex, IssueStore
+from transutil import journal
+from transutil.scanstate import ScanState
+from concurrent.futures import ThreadPoolExecutor
 from os.path import splitext
 import os
 from githubutil.github import GithubOperator
-import json
+from githubutil.graphql import GraphqlClient
+from githubutil.tokenpool import TokenPool
 from datetime import datetime, timedelta
-import re
 import logging
 import hashlib
-from shutil import copyfile
+
+# Fall back to a full scan when too many files changed since last scan.
+MAX_INCREMENTAL_FILES = 1000
+# Issue body is limited to 65536 characters.
+MAX_DIFF_SIZE = 60000
+HASH_CHUNK_SIZE = 1024 * 1024
+GITHUB_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+# Issues updated shortly before a sync are fetched again by the next one,
+# Github may index an update after the request which lists it.
+SYNC_OVERLAP = timedelta(minutes=5)
 
 
 def md5_hash(file_name):
     hash_util = hashlib.md5()
     with open(file_name, 'rb') as afile:
-        buf = afile.read()
-        hash_util.update(buf)
+        for buf in iter(lambda: afile.read(HASH_CHUNK_SIZE), b""):
+            hash_util.update(buf)
     return hash_util.hexdigest()
 
 
+def _issue_record(issue, labels=None):
+    """
+    :type issue: github.Issue.Issue
+    :param labels: Label names, read from the issue if it's None.
+    :rtype: dict
+    """
+    if labels is None:
+        labels = [label.name for label in issue.labels]
+    return {
+        "number": issue.number,
+        "title": issue.title,
+        "labels": list(labels),
+        "updated_at": issue.updated_at.strftime(GITHUB_TIME_FORMAT)
+    }
+
+
 class TranslateUtil:
     _git_path = ""
+    _git_workers = 1
+    _read_index = False
+    _state_path = ""
     _github_token = ""
     _configure = None
+    _history_cache = None
+    _listing_cache = None
+    _blob_cache = None
+    _issue_stores = None
+    _github_operator = None
+    _token_pool = None
+    _github_readers = None
+    _graphql_endpoint = None
+    _git_pool = None
 
-    def __init__(self, config_file, github_token, git_path="git"):
+    def __init__(self, config_file, github_token, git_path="git",
+                 state_path="", git_workers=1,
+                 read_index=False, read_tokens=None, graphql_endpoint=None):
         """
         Initialization.
 
@@ -36,10 +82,33 @@ class TranslateUtil:
         :type github_token: str
         :param git_path: Executable git path.
         :type git_path: str
+        :param state_path: Directory to persist scan results in, scans
+        will be incremental when it's not empty.
+        :type state_path: str
+        :param git_workers: Number of git queries running concurrently.
+        :type git_workers: int
+        :param read_index: List files by reading ``.git/index`` in process.
+        :type read_index: bool
+        :param read_tokens: Tokens to spread read-only Github requests
+        over, writes always use ``github_token``.
+        :type read_tokens: list of str
+        :param graphql_endpoint: URL of the Github GraphQL API, defaults
+        to api.github.com.
+        :type graphql_endpoint: str
         """
         self._git_path = git_path
-        self._configure = Configuration(config_file)
+        self._state_path = state_path
+        self._git_workers = git_workers
+        self._read_index = read_index
+        self._configure = Configuration.load(config_file)
         self._github_token = github_token
+        self._token_pool = TokenPool(read_tokens or [])
+        self._github_readers = {}
+        self._graphql_endpoint = graphql_endpoint
+        self._history_cache = {}
+        self._listing_cache = {}
+        self._blob_cache = {}
+        self._issue_stores = {}
 
     def _filter_file_type(self, repository_name, file_name_list):
         """
@@ -50,7 +119,7 @@ class TranslateUtil:
         :type file_name_list: list
         :rtype: list
         """
-        ext_list = self._configure.get_valid_extensions(repository_name)
+        ext_list = self._configure.get_extension_set(repository_name)
         result = []
         for file_name in file_name_list:
             _, ext = splitext(file_name)
@@ -59,54 +128,214 @@ class TranslateUtil:
         return result
 
     def _get_git_commander(self, repo):
-        return GitCommand(repo, self._git_path)
+        """
+        :rtype: GitCommand
+        """
+        return GitCommand(repo, self._git_path, self._read_index)
+
+    def _get_git_pool(self):
+        """
+        Pool of ``git_workers`` threads, shared by all the scans of this
+        object.
+
+        :rtype: GitPool
+        """
+        if self._git_pool is None:
+            self._git_pool = GitPool(self._git_workers, self._git_path)
+        return self._git_pool
+
+    def close(self):
+        """
+        Stop the git pool, if one is started.
+        """
+        if self._git_pool is not None:
+            self._git_pool.close()
+            self._git_pool = None
 
     def _get_repo_path(self, repository_name, branch_name):
         self._configure.repository = repository_name
         branch_item = self._configure.get_branch(repository_name, branch_name)
         return branch_item["path"]
 
-    @staticmethod
-    def __is_ignore(file_name, ignore_list):
-        result = False
-        for pattern in ignore_list:
-            if re.match(pattern, file_name):
-                result = True
-                break
-        return result
+    def _get_scan_paths(self, repository):
+        """
+        :return: The source path and all the language paths.
+        :rtype: list of str
+        """
+        path_list = [self._configure.get_source(repository)["path"]]
+        for language in self._configure.list_languages(repository):
+            path_list.append(language["path"])
+        return path_list
+
+    def _get_history(self, repository, branch):
+        """
+        History index of the branch, shared by all the languages.
+
+        :rtype: HistoryIndex
+        """
+        repo_path = self._get_repo_path(repository, branch)
+        if repo_path not in self._history_cache:
+            self._history_cache[repo_path] = HistoryIndex(
+                self._get_git_commander(repo_path),
+                self._get_scan_paths(repository))
+        return self._history_cache[repo_path]
+
+    def _get_ignore_filter(self, repository, branch, ignore):
+        """
+        :param ignore: Filter out files matching the ignore list of the branch.
+        :return: A function tells if the file should be kept.
+        """
+        if not ignore:
+            return lambda file_name: True
+        matcher = self._configure.get_ignore_matcher(repository, branch)
+        return lambda file_name: not matcher.match(file_name)
+
+    def _get_listing(self, repository, branch):
+        """
+        Files with valid extensions in the source and language paths of
+        the branch, listed once and shared by all the lookups.
+
+        :rtype: list of str
+        """
+        repo_path = self._get_repo_path(repository, branch)
+        if repo_path not in self._listing_cache:
+            self._listing_cache[repo_path] = list(
+                self._get_git_commander(repo_path).list_files(
+                    self._get_scan_paths(repository),
+                    self._configure.get_valid_extensions(repository)))
+        return self._listing_cache[repo_path]
 
-    def _remove_ignore_files(self, file_list, repository, branch):
-        ignore_list = self._configure.get_ignore_re_list(repository, branch)
-        result_list = [item for item in file_list if not self.__is_ignore(item, ignore_list)]
-        return result_list
+    def _get_blobs(self, repository, branch):
+        """
+        Blob ids of the files in the listing, from the index of the
+        branch, so files can be compared without reading them.
 
-    def _get_clean_files(self, repository, branch, path):
+        :return: {file name: blob id}
+        :rtype: dict
+        """
+        repo_path = self._get_repo_path(repository, branch)
+        if repo_path not in self._blob_cache:
+            self._blob_cache[repo_path] = dict(
+                self._get_git_commander(repo_path).list_blobs(
+                    self._get_scan_paths(repository),
+                    self._configure.get_valid_extensions(repository)))
+        return self._blob_cache[repo_path]
+
+    def _get_clean_files(self, repository, branch, path, ignore=False):
         """
         Get file list in specified path.
 
         :param path: Relative path of the files we want.
         :type path: str
+        :param ignore: Filter out files matching the ignore list of the branch.
+        :type ignore: bool
         :rtype: list
         """
+        prefix = path + "/"
+        keep = self._get_ignore_filter(repository, branch, ignore)
+        return [file_name[len(path):]
+                for file_name in self._get_listing(repository, branch)
+                if file_name.startswith(prefix) and
+                keep(file_name[len(path):])]
 
-        file_list = self._get_git_commander(
-            self._get_repo_path(repository, branch)
-        ).list_files()
-        file_list = self._filter_file_type(repository, file_list)
-        path_sep = path.split(os.sep)
-        result = [file_name[len(path):]
-                  for file_name in file_list
-                  if file_name.split(os.sep)[:len(path_sep)] == path_sep]
-        return result
+    def _get_github_operator(self):
+        """
+        :rtype: GithubOperator
+        """
+        if self._github_operator is None:
+            self._github_operator = GithubOperator(self._github_token)
+        return self._github_operator
+
+    def _get_github_reader(self, resource="core"):
+        """
+        Operator for read-only requests, on the pooled token with the most
+        budget left. Objects it returns must not be written through.
+
+        :param resource: "core" or "search".
+        :rtype: GithubOperator
+        """
+        token = self._token_pool.pick(resource)
+        if token is None:
+            return self._get_github_operator()
+        if token not in self._github_readers:
+            self._github_readers[token] = GithubOperator(token)
+        return self._github_readers[token]
+
+    def _get_graphql_reader(self):
+        """
+        GraphQL client for read-only queries, on the pooled token with the
+        most budget left.
+
+        :rtype: GraphqlClient
+        """
+        token = self._token_pool.pick("graphql") or self._github_token
+        return GraphqlClient(token, self._graphql_endpoint)
 
     def list_branches(self, repository_name):
         return self._configure.list_branch(repository_name)
 
     def wait_for_limit(self, core_limit=10, search_limit=10):
-        github_client = GithubOperator(self._github_token)
+        github_client = self._get_github_operator()
         github_client.check_limit(core_limit, search_limit)
 
-    def find_new_files(self, repository_name, branch_name, language):
+    def _load_scan_state(self, repository, branch, language, kind,
+                         full_scan):
+        """
+        Load the persisted scan of the branch and find out the files
+        changed since then.
+
+        :return: Scan state, current HEAD and set of changed file names
+        (relative to the source/language path), the set is None if a
+        full scan is needed.
+        :rtype: tuple
+        """
+        if len(self._state_path) == 0:
+            return None, None, None
+        git_cmd = self._get_git_commander(
+            self._get_repo_path(repository, branch))
+        head = git_cmd.get_head()
+        state = ScanState(self._state_path, repository, branch, language,
+                          kind)
+        if full_scan or state.head is None or \
+                not git_cmd.is_ancestor(state.head, head):
+            return state, head, None
+
+        path_list = [self._configure.get_source(repository)["path"],
+                     self._configure.get_languages(repository, language)["path"]]
+        changed = set()
+        # Walk the commits instead of diffing the two ends, a file which
+        # was changed and reverted still has a new last commit.
+        for _, _, _, file_list in git_cmd.iter_log(
+                path_list, "{}..{}".format(state.head, head)):
+            for file_name in self._filter_file_type(repository, file_list):
+                for path in path_list:
+                    if file_name.startswith(path + "/"):
+                        changed.add(file_name[len(path):])
+        if len(changed) > MAX_INCREMENTAL_FILES:
+            return state, head, None
+        return state, head, changed
+
+    def _get_existing_files(self, repository, branch, path, file_list,
+                            ignore=False):
+        """
+        Which of the files still exists in the path.
+
+        :type file_list: set of str
+        :param ignore: Filter out files matching the ignore list of the branch.
+        :type ignore: bool
+        :rtype: set of str
+        """
+        if len(file_list) == 0:
+            return set()
+        git_cmd = self._get_git_commander(
+            self._get_repo_path(repository, branch))
+        keep = self._get_ignore_filter(repository, branch, ignore)
+        existing = git_cmd.list_files([path + item for item in file_list])
+        return set([item[len(path):] for item in existing
+                    if keep(item[len(path):])])
+
+    def find_new_files(self, repository_name, branch_name, language,
+                       full_scan=False):
         """
         Find files which is in the source path, but not in the
         target path, and return it as a List of string.
@@ -116,59 +345,118 @@ class TranslateUtil:
         :rtype: list of str
         :param language: Language name (in the configure file)
         :type language: str
+        :param full_scan: Ignore the persisted scan state.
+        :type full_scan: bool
         """
         target_path = self._configure.get_languages(
             repository_name, language)["path"]
         source_path = self._configure.get_source(
             repository_name)["path"]
 
-        # List files in source/language path
-        source_list = self._get_clean_files(repository_name,
-                                            branch_name, source_path)
-        target_list = self._get_clean_files(repository_name,
-                                            branch_name, target_path)
+        state, head, changed = self._load_scan_state(
+            repository_name, branch_name, language, "new", full_scan)
+        if changed is None:
+            # List files in source/language path
+            source_list = self._get_clean_files(repository_name,
+                                                branch_name, source_path,
+                                                ignore=True)
+            target_list = self._get_clean_files(repository_name,
+                                                branch_name, target_path)
+            result = set(source_list) - set(target_list)
+        else:
+            source_list = self._get_existing_files(
+                repository_name, branch_name, source_path, changed,
+                ignore=True)
+            target_list = self._get_existing_files(
+                repository_name, branch_name, target_path, changed)
+            result = (set(state.result) - changed) | (source_list - target_list)
 
         # return the different files list
-        result = list(set(source_list) - set(target_list))
+        result = list(result)
         result.sort()
-        return self._remove_ignore_files(result, repository_name, branch_name)
+        if state is not None:
+            state.save(head, result)
+        return result
+
+    def _get_issue_store(self, file_name):
+        """
+        :rtype: IssueStore
+        """
+        if file_name not in self._issue_stores:
+            self._issue_stores[file_name] = IssueStore(file_name)
+        return self._issue_stores[file_name]
 
     def cache_issues(self, query, file_name, search_limit=30):
         """
+        Replace the issues in the store with the search result.
 
         :param search_limit:
         :param query: Github query string
-        :param file_name: Save search result into a json file
-
-        record = {"query": query,
-            "timestamp": 1234567
-            items:
-            [
-                {
-                "number": 1234,
-                "title": "Issue Title",
-                labels: ["version/1.12", "translating"]
-                },
-            ]
-        }
-        """
-        github_client = GithubOperator(self._github_token)
+        :param file_name: SQLite file of the ``IssueStore``
+        :return: Count of the cached issues.
+        :rtype: int
+        """
+        started_at = time.time()
+        github_client = self._get_github_reader("search")
         issue_list = github_client.search_issue(query, search_limit)
-        result = []
-        for issue in issue_list:
-            issue_item = {
-                "number": issue.number,
-                "title": issue.title,
-                "labels": []
-            }
-            for label in issue.labels:
-                issue_item["labels"].append(label.name)
-            result.append(issue_item)
-        with open(file_name, "w") as handle:
-            json.dump(result, handle, indent=2)
+        result = [_issue_record(issue) for issue in issue_list]
+        store = self._get_issue_store(file_name)
+        store.replace_all(result)
+        self._save_synced_at(store, github_client, started_at)
         return len(result)
 
-    def find_updated_files(self, repository_name, branch_name, language):
+    @staticmethod
+    def _save_synced_at(store, github_client, started_at):
+        """
+        Save the server time of the sync start, less ``SYNC_OVERLAP``, so
+        the clock of this host doesn't matter.
+
+        :param started_at: Local epoch seconds of the sync start.
+        :type github_client: GithubOperator
+        """
+        synced_at = github_client.get_server_time(started_at) - SYNC_OVERLAP
+        store.set_meta("synced_at", synced_at.strftime(GITHUB_TIME_FORMAT))
+
+    def refresh_issue_cache(self, github_repository, file_name,
+                            search_limit=30):
+        """
+        Update the store with the issues of the repository changed since
+        the last caching, closed issues are removed.
+
+        :param github_repository: Name of the repository.
+        :param file_name: SQLite file of the ``IssueStore``
+        :return: Count of (updated, removed) issues.
+        :rtype: tuple
+        """
+        store = self._get_issue_store(file_name)
+        synced_at = store.get_meta("synced_at")
+        since = None
+        if synced_at is not None:
+            since = datetime.strptime(synced_at, GITHUB_TIME_FORMAT)
+        started_at = time.time()
+        github_client = self._get_github_reader()
+        github_client.check_limit(search_limit, 0)
+        open_list = []
+        closed_list = []
+        count = 0
+        for issue in github_client.list_issues(github_repository, "all",
+                                               since):
+            count += 1
+            if count % 100 == 0:
+                github_client.check_limit(search_limit, 0)
+            if issue.pull_request is not None:
+                continue
+            if issue.state == "open":
+                open_list.append(_issue_record(issue))
+            else:
+                closed_list.append(issue.number)
+        updated = store.upsert(open_list)
+        store.delete(closed_list)
+        self._save_synced_at(store, github_client, started_at)
+        return updated, len(closed_list)
+
+    def find_updated_files(self, repository_name, branch_name, language,
+                           full_scan=False, max_diff_size=MAX_DIFF_SIZE):
         """
         Find files match this criteria:
         - Both in source and target.
@@ -182,37 +470,79 @@ class TranslateUtil:
         :rtype: dict
         :param language: Language name (in the configure file)
         :type language: str
+        :param full_scan: Ignore the persisted scan state.
+        :type full_scan: bool
+        :param max_diff_size: Truncate the diff of a file to this many
+        characters, 0 means no limit.
+        :type max_diff_size: int
         """
 
         repository_path = self._configure.get_branch(repository_name,
                                                      branch_name)["path"]
-        git_cmd = self._get_git_commander(repository_path)
 
         target_path = self._configure.get_languages(repository_name,
                                                     language)["path"]
         source_path = self._configure.get_source(repository_name)["path"]
 
+        state, head, changed = self._load_scan_state(
+            repository_name, branch_name, language, "updated", full_scan)
         # get files both in source and target.
-        source_list = self._get_clean_files(repository_name,
-                                            branch_name, source_path)
-        target_list = self._get_clean_files(repository_name,
-                                            branch_name, target_path)
+        if changed is None:
+            source_list = self._get_clean_files(repository_name,
+                                                branch_name, source_path)
+            target_list = self._get_clean_files(repository_name,
+                                                branch_name, target_path)
+            result = {}
+        else:
+            source_list = self._get_existing_files(
+                repository_name, branch_name, source_path, changed)
+            target_list = self._get_existing_files(
+                repository_name, branch_name, target_path, changed)
+            result = {file_name: diff
+                      for file_name, diff in state.result.items()
+                      if file_name not in changed}
         same_files = list(set(source_list) & set(target_list))
 
-        result = {}
+        history = self._get_history(repository_name, branch_name)
+
+        triples = []
         for file_name in same_files:
             source_last_commit = \
-                git_cmd.get_last_commit(source_path + file_name)
+                history.get_last_commit(source_path + file_name)
             target_commit = \
-                git_cmd.get_last_commit(target_path + file_name)
-            target_time = git_cmd.get_hash_time(target_commit)
-            source_base_commit = git_cmd.get_file_hash_before(
+                history.get_last_commit(target_path + file_name)
+            target_time = history.get_author_time(target_commit)
+            # None if the translation is older than the source, the
+            # whole source is diffed against the empty tree.
+            source_base_commit = history.get_commit_before(
                 source_path + file_name, target_time)
             if source_base_commit != source_last_commit:
-                diff = git_cmd.get_diff_by_hash(
-                    source_path + file_name,
-                    source_last_commit, source_base_commit)
-                result[file_name] = diff
+                triples.append((source_path + file_name,
+                                source_last_commit, source_base_commit))
+
+        if self._git_workers > 1:
+            # Files of a commit pair are diffed by one git process, the
+            # pairs are dealt to the workers, largest first, to the one
+            # with the fewest files.
+            pairs = {}
+            for triple in triples:
+                pairs.setdefault(triple[1:], []).append(triple)
+            chunks = [[] for _ in range(self._git_workers)]
+            for pair_triples in sorted(pairs.values(), key=len,
+                                       reverse=True):
+                min(chunks, key=len).extend(pair_triples)
+            queries = [(repository_path, "get_diffs_by_hash",
+                        (chunk, max_diff_size))
+                       for chunk in chunks if len(chunk) > 0]
+            diff_list = [item for chunk in self._get_git_pool().map(queries)
+                         for item in chunk.items()]
+        else:
+            diff_list = self._get_git_commander(repository_path).iter_diffs(
+                triples, max_diff_size)
+        for file_name, diff in diff_list:
+            result[file_name[len(source_path):]] = diff
+        if state is not None:
+            state.save(head, result)
         return result
 
     def get_default_label(self, repository_name, branch, language):
@@ -223,7 +553,7 @@ class TranslateUtil:
         :param language:
         :return:
         """
-        labels = self._configure.get_repository(repository_name)["labels"]
+        labels = list(self._configure.get_repository(repository_name)["labels"])
         labels += self._configure.get_branch(repository_name, branch)["labels"]
         labels += self._configure.get_languages(repository_name, language)["labels"]
         return labels
@@ -236,26 +566,57 @@ class TranslateUtil:
         :param language:
         :return:
         """
-        labels = self._configure.get_branch(repository_name, branch)["labels"].copy()
+        labels = list(self._configure.get_branch(repository_name, branch)["labels"])
         labels += self._configure.get_languages(repository_name, language)["labels"]
         return labels
 
+    def build_issue_index(self, github_repository, search_labels=None,
+                          core_limit=10):
+        """
+        List the open issues with the labels once, page by page with the
+        REST API instead of the search API, for ``create_issue`` to find
+        duplicated issues in memory.
+
+        :param github_repository: Name of the repository.
+        :param search_labels: Only index issues with all of these labels.
+        :type search_labels: list of str
+        :rtype: IssueIndex
+        """
+        github_client = self._get_github_reader()
+        github_client.check_limit(core_limit, 0)
+        index = IssueIndex()
+        count = 0
+        for issue in github_client.list_issues(github_repository, "open",
+                                               labels=search_labels):
+            count += 1
+            if count % 100 == 0:
+                github_client.check_limit(core_limit, 0)
+            if issue.pull_request is not None:
+                continue
+            index.add(issue.number, issue.title,
+                      [label.name for label in issue.labels])
+        return index
+
     def create_issue(self, github_repository, title, body, labels=None,
                      search_labels=None,
                      search_cache="",
-                     search_online=False):
+                     search_online=False,
+                     dedupe_index=None):
         """
 
         :param labels: Labels for new issue
         :type labels: list of str
         :param search_online: Search duplicated issues online
+        :param dedupe_index: Find duplicated issues in the index, from
+        ``build_issue_index``, the new issue is added to it.
+        :type dedupe_index: IssueIndex
         :param github_repository: Name of the repository.
         :param title: Title of the new issue.
 
         :param body: Body of the new issue.
         :param search_labels: Search duplicated issues with title & labels.
         :type search_labels: list of str
-        :param search_cache: Search in the cache file
+        :param search_cache: Search in the ``IssueStore`` file
         :type search_cache: str
         :rtype: github.Issue.Issue
         """
@@ -264,39 +625,128 @@ class TranslateUtil:
         if labels is None:
             labels = []
         dupe = False
+        store = None
         if len(search_cache) > 0:
-            with open(search_cache, "r") as handler:
-                obj = json.load(handler)
-                for issue_record in obj:
-                    if issue_record["title"] == title:
-                        if len(search_labels) == 0:
-                            dupe = True
-                            break
-                        else:
-                            if set(search_labels).issubset(issue_record["labels"]):
-                                dupe = True
-                            break
-
-        github_client = GithubOperator(self._github_token)
-        if search_online:
+            store = self._get_issue_store(search_cache)
+            dupe = len(store.find(title, search_labels)) > 0
+        if dedupe_index is not None and not dupe:
+            dupe = len(dedupe_index.find(title, search_labels)) > 0
+
+        github_client = self._get_github_operator()
+        if search_online and not dupe:
             search_cmd = "repo:{} state:open is:issue in:title {}".format(github_repository, title)
             if len(search_labels) > 0:
                 search_cmd = "{} {}".format(search_cmd,
                                             " ".join(
                                                 ["label:{}".format(i) for i in search_labels])
                                             )
-            issue_list = github_client.search_issue(search_cmd)
+            issue_list = self._get_github_reader("search").search_issue(
+                search_cmd)
             for issue in issue_list:
                 if issue.title == title:
                     dupe = True
         if dupe:
             return None
-        new_issue = github_client.create_issue(github_repository, title, body)
-        # Add labels
-        for label_name in labels:
-            new_issue.add_to_labels(label_name)
+        new_issue = github_client.create_issue(github_repository, title,
+                                               body, labels)
+        if store is not None:
+            store.upsert([_issue_record(new_issue, labels)])
+        if dedupe_index is not None:
+            dedupe_index.add(new_issue.number, title, labels)
         return new_issue
 
+    def create_issues(self, github_repository, journal_file, items=None,
+                      search_labels=None, dedupe_index=None, max_write=0,
+                      core_limit=10):
+        """
+        Create issues in bulk through a journal, unfinished issues of the
+        journal are resumed before the new items.
+
+        Issues found in ``dedupe_index`` are skipped, this also catches
+        issues created by an interrupted run before it was journaled.
+        Items with the title of a journaled issue, or of an earlier item,
+        are skipped too, with the journaled issue number, None if it's
+        not created yet.
+
+        :param github_repository: Name of the repository.
+        :param journal_file: File of the ``IssueJournal``.
+        :param items: Issues to create, dicts with "title", "body" and
+        "labels".
+        :type items: list of dict
+        :param search_labels: Labels of the duplicated issues.
+        :type search_labels: list of str
+        :param dedupe_index: Open issues, from ``build_issue_index``.
+        :type dedupe_index: IssueIndex
+        :param max_write: Stop after creating this many issues, the rest
+        stay in the journal, 0 means no limit.
+        :type max_write: int
+        :return: Generator of (title, "created", "labeled" or "skipped",
+        issue number).
+        """
+        if search_labels is None:
+            search_labels = []
+        issue_journal = journal.IssueJournal(journal_file)
+
+        def find_dupe(title):
+            if dedupe_index is None:
+                return None
+            numbers = dedupe_index.find(title, search_labels)
+            return numbers[0] if len(numbers) > 0 else None
+
+        new_items = []
+        titles = set()
+        for item in items or []:
+            entry = issue_journal.get(item["title"])
+            if entry is not None or item["title"] in titles:
+                yield item["title"], "skipped", (entry or {}).get("number")
+                continue
+            titles.add(item["title"])
+            number = find_dupe(item["title"])
+            if number is not None:
+                yield item["title"], "skipped", number
+                continue
+            new_items.append(item)
+        issue_journal.plan(new_items)
+
+        github_client = self._get_github_operator()
+        repo = github_client.get_repo(github_repository)
+        created = 0
+        for entry in issue_journal.pending():
+            title = entry["title"]
+            if entry["state"] == journal.PLANNED:
+                if 0 < max_write <= created:
+                    break
+                number = find_dupe(title)
+                if number is None:
+                    if created % 50 == 0:
+                        github_client.check_limit(core_limit, 0)
+                    # Labels are set by the creation.
+                    issue = github_client.write(repo.create_issue, title,
+                                                entry["body"],
+                                                labels=entry["labels"])
+                    number = issue.number
+                    created += 1
+                    if dedupe_index is not None:
+                        dedupe_index.add(number, title, entry["labels"])
+                    issue_journal.mark(title, journal.LABELED, number)
+                    yield title, "created", number
+                    yield title, "labeled", number
+                    continue
+                issue_journal.mark(title, journal.CREATED, number)
+                entry["number"] = number
+                yield title, "created", number
+            # Found in the index, or journaled by an older run which
+            # labeled the issues after creating them.
+            issue = repo.get_issue(entry["number"])
+            labels = [label.name for label in issue.labels]
+            labels += [label for label in entry["labels"]
+                       if label not in labels]
+            github_client.write(github_client.replace_labels, issue, labels)
+            issue_journal.mark(title, journal.LABELED)
+            yield title, "labeled", entry["number"]
+        if len(issue_journal.pending()) == 0:
+            issue_journal.clear()
+
     def gen_source_url(self, repo, branch, file_name):
         """
 
@@ -328,23 +778,30 @@ class TranslateUtil:
             repository, branch, language, days, search_limit
         )
         pr_file_list = self._clean_pr_files(pr_list, repository, language)
+        task_issues = self._find_task_issues(
+            repository, branch, language,
+            [pr_record["file_name"] for pr_record in pr_file_list])
         result = []
         for pr_record in pr_file_list:
-            result += self._sync_task_with_file_name(repository, branch, language, pr_record)
+            result += self._sync_task_with_file_name(
+                repository, branch, language, pr_record,
+                task_issues[pr_record["file_name"]])
         return result
 
     def _get_code_pr_and_files(self, repository,
                                branch, language, days=5,
                                search_limit=30):
         """
-        Find recent PRs with specified language.
+        Find recent PRs with specified language, with their files, refs
+        and bot comments, in batched GraphQL queries.
 
         :param days:
         :return:
         :param repository: Repository name
         :param branch: Branch name
         :param language: Language
-        :param search_limit:
+        :param search_limit: Wait for the reset if less GraphQL requests
+        are left.
         :return:
         """
         after_date = datetime.now() - timedelta(days=days)
@@ -364,33 +821,19 @@ class TranslateUtil:
             after_date
         )
         logging.warning(query)
-        github_client = GithubOperator(self._github_token)
-        pr_list = github_client.search_issue(query, search_limit)
+        graphql_client = self._get_graphql_reader()
+        graphql_client.check_limit(search_limit)
         result = []
-        for item in pr_list:
-            pr = item.as_pull_request()
-            if pr.base.ref != base:
+        for record in graphql_client.search_pull_requests(code_repo, query):
+            if record["base"] != base:
                 continue
-            file_name_list = []
-            for file_record in pr.get_files():
-                file_name_list.append(file_record.filename)
-            file_name_list = self._filter_file_type(repository, file_name_list)
-            file_name_list = [file_name for file_name in file_name_list if file_name.startswith(prefix)]
-            record = {
-                "url": pr.html_url,
-                "number": pr.number,
-                "files": file_name_list,
-                "merged": pr.is_merged(),
-                "base": pr.base.ref,
-                "head": pr.head.ref,
-                "owner": pr.user.login,
-                "comments": [],
-                "object": pr
-            }
-            # get comments
-            for comment in pr.get_issue_comments():
-                if comment.body.startswith("`[trans-bot:"):
-                    record["comments"].append(comment.body)
+            file_name_list = self._filter_file_type(repository,
+                                                    record["files"])
+            record["files"] = [file_name for file_name in file_name_list
+                               if file_name.startswith(prefix)]
+            record["repo"] = code_repo
+            record["comments"] = [comment for comment in record["comments"]
+                                  if comment.startswith("`[trans-bot:")]
             result.append(record)
         return result
 
@@ -412,7 +855,7 @@ class TranslateUtil:
                 body_pattern = "Thank you @{}, I can only process the PR with 1 file included, "
                 body = "`[trans-bot:N/A]`\n\n" + body_pattern.format(pr["owner"]) + \
                        "will not be reported to the task issues."
-                pr["object"].create_issue_comment(body)
+                self._comment_pr(pr, body)
                 continue
             path_sep = target_path.split(os.sep)
             file_list = []
@@ -423,49 +866,91 @@ class TranslateUtil:
             result.append(pr.copy())
         return result
 
-    def _remove_status_label(self, repository, issue_item):
-        for status in ["pushed", "merged", "pending", "working"]:
-            status_label = self._configure.get_status_label(repository, status)
-            if status_label in issue_item["labels"]:
-                issue_item["object"].remove_from_labels(status_label)
+    def _comment_pr(self, pr, body):
+        """
+        Comment on the PR as the user, the PR object may come from a
+        pooled token.
+        """
+        self._get_github_operator().issue_comment(pr["repo"], pr["number"],
+                                                  body)
 
-    def _sync_task_with_file_name(self, repository, branch, language, pr):
-        search_labels = self.get_search_label(repository, branch, language)
+    def _set_status_label(self, repository, issue_item, status):
+        """
+        Replace the status labels of the issue with the status, in one
+        request.
+        """
+        status_labels = [self._configure.get_status_label(repository, item)
+                         for item in ["pushed", "merged", "pending", "working"]]
+        new_labels = [label for label in issue_item["labels"]
+                      if label not in status_labels]
+        new_labels.append(self._configure.get_status_label(repository, status))
+        github_client = self._get_github_operator()
+        github_client.replace_labels(issue_item["object"], new_labels,
+                                     issue_item["labels"])
+
+    def _get_task_repo_name(self, repository):
         repository_data = self._configure.get_repository(repository)
-        task_repo_name = "{}/{}".format(
+        return "{}/{}".format(
             repository_data["github"]["task"]["owner"],
             repository_data["github"]["task"]["repository"]
         )
+
+    def _find_task_issues(self, repository, branch, language, file_names):
+        """
+        Open task issues titled with the file names, all the searches are
+        sent in aliased GraphQL queries.
+
+        :return: List of issue dicts of each file name.
+        :rtype: dict
+        """
+        search_labels = self.get_search_label(repository, branch, language)
+        task_repo_name = self._get_task_repo_name(repository)
+        queries = {}
+        for file_name in file_names:
+            queries[file_name] = \
+                "repo:{} state:open type:issue in:title {} {}".format(
+                    task_repo_name,
+                    " ".join(["label:{}".format(i) for i in search_labels]),
+                    file_name
+                )
+            logging.warning(queries[file_name])
+        if len(queries) == 0:
+            return {}
+        issues = self._get_graphql_reader().search_issues(queries)
+        return {file_name: [issue for issue in issue_list
+                            if issue["title"] == file_name]
+                for file_name, issue_list in issues.items()}
+
+    def _sync_task_with_file_name(self, repository, branch, language, pr,
+                                  issue_list=None):
+        """
+        :param issue_list: Task issues of the PR's file, from
+        ``_find_task_issues``, searched if it's None.
+        """
+        task_repo_name = self._get_task_repo_name(repository)
         file_name = pr["file_name"]
-        query = "repo:{} state:open type:issue in:title {} {}".format(
-            task_repo_name,
-            " ".join(["label:{}".format(i) for i in search_labels]),
-            file_name
-        )
-        logging.warning(query)
-        github_client = GithubOperator(self._github_token)
-        issue_list = github_client.search_issue(query)
+        if issue_list is None:
+            issue_list = self._find_task_issues(
+                repository, branch, language, [file_name])[file_name]
         result = []
         for issue in issue_list:
-            if issue.title != file_name:
-                continue
             issue_item = {
-                "title": issue.title,
-                "number": issue.number,
-                "url": issue.html_url,
-                "labels": [],
-                "object": issue,
+                "title": issue["title"],
+                "number": issue["number"],
+                "url": issue["url"],
+                "labels": list(issue["labels"]),
+                # Written as the user, built without a request.
+                "object": self._get_github_operator().get_issue(
+                    task_repo_name, issue["number"]),
             }
-            if issue.assignee is not None:
-                issue_item["owner"] = issue.assignee.login
+            if issue["assignee"] is not None:
+                issue_item["owner"] = issue["assignee"]
             else:
                 body_pattern = "Thank you @{}, the [related task issue]({}) has no assignee. "
                 body = "`[trans-bot:N/A]`\n\n" + body_pattern.format(pr["owner"], issue_item["url"]) + \
                        "will not be reported to the task issues"
-                pr["object"].create_issue_comment(body)
+                self._comment_pr(pr, body)
                 continue
-            for label in issue.labels:
-                issue_item["labels"].append(label.name)
             issue_working = self._configure.get_status_label(
                 repository, "working") in issue_item["labels"]
             issue_pushed = self._configure.get_status_label(
@@ -475,20 +960,19 @@ class TranslateUtil:
                 body_pattern = "Thank you @{}, the [related task issue]({}) had been assigned to others. "
                 body = "`[trans-bot:N/A]`\n\n" + body_pattern.format(pr["owner"], issue_item["url"]) + \
                        "will not be reported to the task issues"
-                pr["object"].create_issue_comment(body)
+                self._comment_pr(pr, body)
                 result.append(pr["url"])
                 continue
             if pr["merged"]:
                 body_pattern = "Thank you @{}, the [related task issue]({}) had been updated."
                 if issue_pushed:
-                    issue.create_comment("/merged")
+                    issue_item["object"].create_comment("/merged")
                 else:
-                    self._remove_status_label(repository, issue_item)
-                    issue.add_to_labels(self._configure.get_status_label(repository, "pushed"))
+                    self._set_status_label(repository, issue_item, "pushed")
                     time.sleep(1)
-                    issue.create_comment("/merged")
+                    issue_item["object"].create_comment("/merged")
                 body = "`[trans-bot:merged]`\n\n" + body_pattern.format(pr["owner"], issue_item["url"])
-                pr["object"].create_issue_comment(body)
+                self._comment_pr(pr, body)
 
                 result.append(pr["url"])
                 continue
@@ -497,59 +981,155 @@ class TranslateUtil:
             if issue_pushed:
                 continue
             if not issue_working:
-                self._remove_status_label(repository, issue_item)
-                issue.add_to_labels(self._configure.get_status_label(repository, "working"))
+                self._set_status_label(repository, issue_item, "working")
                 time.sleep(1)
-            pr["object"].create_issue_comment(body)
-            issue.create_comment("/pushed")
+            self._comment_pr(pr, body)
+            issue_item["object"].create_comment("/pushed")
             result.append(pr["url"])
         return result
 
-    def copy_version(self, repository, from_version, to_version, target_lang):
-        config = self._configure
-        source_repo_base_path = config.get_branch(repository, from_version)["path"]
-        target_repo_base_path = config.get_branch(repository, to_version)["path"]
+    def _find_same_sources(self, repository, from_version, to_version,
+                           file_list, workers=4, by_content=False,
+                           hashes=None):
+        """
+        Files whose source is the same in both versions, compared by the
+        blob ids in the git index, or by md5 if the ids don't help.
+
+        :param file_list: File names relative to the source path.
+        :type file_list: set of str
+        :param hashes: md5 of the files already hashed, by full path,
+        shared by the calls.
+        :type hashes: dict
+        :rtype: set of str
+        """
+        source_lang_path = self._configure.get_source(repository)["path"]
+        source_blobs = {}
+        target_blobs = {}
+        if not by_content:
+            source_blobs = self._get_blobs(repository, from_version)
+            target_blobs = self._get_blobs(repository, to_version)
+        if hashes is None:
+            hashes = {}
+
+        result = set()
+        # Files without comparable blob ids, e.g. sha1 vs sha256 repositories.
+        hash_list = []
+        for file_name in file_list:
+            source_blob = source_blobs.get(source_lang_path + file_name)
+            target_blob = target_blobs.get(source_lang_path + file_name)
+            if source_blob is None or target_blob is None or \
+                    len(source_blob) != len(target_blob):
+                hash_list.append((
+                    file_name,
+                    "{}/{}{}".format(
+                        self._get_repo_path(repository, from_version),
+                        source_lang_path, file_name),
+                    "{}/{}{}".format(
+                        self._get_repo_path(repository, to_version),
+                        source_lang_path, file_name)))
+            elif source_blob == target_blob:
+                result.add(file_name)
+        if len(hash_list) > 0:
+            path_list = set([item[1] for item in hash_list] +
+                            [item[2] for item in hash_list])
+            path_list = sorted(path_list - set(hashes.keys()))
+            with ThreadPoolExecutor(workers) as pool:
+                hashes.update(zip(path_list, pool.map(md5_hash, path_list)))
+            for file_name, source_file, target_file in hash_list:
+                if hashes[source_file] == hashes[target_file]:
+                    result.add(file_name)
+        return result
+
+    def copy_version(self, repository, from_version, to_version, target_lang,
+                     dry_run=False, link_mode="copy", workers=4,
+                     by_content=False):
+        """
+        Copy the translations of the files whose source is the same in
+        both versions, existing translations are overwritten.
+
+        :param dry_run: Only return the manifest, copy nothing.
+        :type dry_run: bool
+        :param link_mode: "copy", "hardlink" or "reflink", links fall back
+        to copies, see ``transutil.filecopy.copy_file``.
+        :type link_mode: str
+        :param workers: Number of files hashed or copied concurrently.
+        :type workers: int
+        :param by_content: Compare md5 of the files instead of the blob
+        ids in the git index, e.g. for uncommitted changes.
+        :type by_content: bool
+        :return: Manifest, list of (source file, target file).
+        :rtype: list of tuple
+        """
+        return self.carry_forward(repository, [from_version, to_version],
+                                  target_lang, dry_run, link_mode, workers,
+                                  by_content)
+
+    def carry_forward(self, repository, versions, target_lang,
+                      dry_run=False, link_mode="copy", workers=4,
+                      by_content=False):
+        """
+        Same result as ``copy_version`` from each version to the next one,
+        computed in one pass: the listings and blob ids of every branch
+        are read once, and each translation is copied directly from the
+        branch it's carried from.
+
+        :param versions: Branch names, oldest first, all the branches in
+        the config order if it's None.
+        :type versions: list of str
+        :return: Manifest, list of (source file, target file).
+        :rtype: list of tuple
+        """
+        if versions is None:
+            versions = self._configure.list_branch(repository)
         source_lang_path = self._configure.get_source(repository)["path"]
         target_lang_path = self._configure.get_languages(repository, target_lang)["path"]
+        hashes = {}
 
-        source_repo_source_files = set(self._get_clean_files(repository,
-                                                             from_version, source_lang_path))
-        source_repo_target_files = set(self._get_clean_files(repository,
-                                                             from_version, target_lang_path))
-        source_same_files = (source_repo_source_files & source_repo_target_files)
-        dest_repo_source_files = set(self._get_clean_files(repository,
-                                                           to_version, source_lang_path))
-        same_list = source_same_files & dest_repo_source_files
-        for same_file_name in same_list:
-            source_file = "{}/{}{}".format(
-                source_repo_base_path,
-                source_lang_path,
-                same_file_name
-            )
-            target_file = "{}/{}{}".format(
-                target_repo_base_path,
-                source_lang_path,
-                same_file_name
-            )
-            source_hash = md5_hash(source_file)
-            target_hash = md5_hash(target_file)
-
-            if source_hash == target_hash:
-                source_trans_file = "{}/{}{}".format(
-                    source_repo_base_path,
-                    target_lang_path,
-                    same_file_name
-                )
-                target_trans_file = "{}/{}{}".format(
-                    target_repo_base_path,
-                    target_lang_path,
-                    same_file_name
-                )
-                print(target_hash, source_file)
-                new_path = os.path.dirname(target_trans_file)
-                if not os.path.exists(new_path):
-                    os.makedirs(new_path)
-                copyfile(source_trans_file, target_trans_file)
+        def trans_blob(version, file_name):
+            if by_content:
+                return None
+            return self._get_blobs(repository, version).get(
+                target_lang_path + file_name)
+
+        # Version each file's current translation comes from.
+        origins = {}
+        manifest = []
+        for index, version in enumerate(versions):
+            source_files = set(self._get_clean_files(
+                repository, version, source_lang_path))
+            target_files = set(self._get_clean_files(
+                repository, version, target_lang_path))
+            same_files = set()
+            if index > 0:
+                same_files = self._find_same_sources(
+                    repository, versions[index - 1], version,
+                    source_files & set(origins.keys()), workers, by_content,
+                    hashes)
+            new_origins = {}
+            for file_name in source_files:
+                if file_name in same_files:
+                    new_origins[file_name] = origins[file_name]
+                elif file_name in target_files:
+                    new_origins[file_name] = version
+            origins = new_origins
+
+            for file_name in sorted(same_files):
+                blob_id = trans_blob(origins[file_name], file_name)
+                if blob_id is not None and \
+                        blob_id == trans_blob(version, file_name):
+                    # The translation is already there.
+                    continue
+                manifest.append((
+                    "{}/{}{}".format(
+                        self._get_repo_path(repository, origins[file_name]),
+                        target_lang_path, file_name),
+                    "{}/{}{}".format(
+                        self._get_repo_path(repository, version),
+                        target_lang_path, file_name)))
+
+        if not dry_run:
+            copy_files(manifest, link_mode, workers)
+        return manifest
 
     def set_milestone_by_label(self, repository_name, label_list, milestone,
                                core_limit=10, search_limit=10):
@@ -558,11 +1138,12 @@ class TranslateUtil:
             repository_data["github"]["task"]["owner"],
             repository_data["github"]["task"]["repository"]
         )
-        github_client = GithubOperator(self._github_token)
+        github_client = self._get_github_operator()
         label_query = " ".join(["label:" + item for item in label_list])
         query = "type:issue -milestone:{} repo:{} {}".format(milestone, task_repo_name, label_query)
         logging.info(query)
-        issue_list = github_client.search_issue(query, search_limit)
+        issue_list = self._get_github_reader("search").search_issue(
+            query, search_limit)
 
         count = 0
         for issue in issue_list:
@@ -570,5 +1151,5 @@ class TranslateUtil:
             if count % core_limit == 0:
                 github_client.check_limit(core_limit, search_limit)
             github_client.set_issue_milestone(task_repo_name,
-                                              issue, milestone)
+                                              issue.number, milestone)
         return count